@@ -1,19 +1,29 @@
 # -*- coding: utf-8 -*-
+import time
+
+_IMPORT_START = time.perf_counter()
+
 import os
 import pathlib
 import webbrowser
 import datetime
 import json
+import threading
 
 from qgis.core import QgsApplication, QgsSettings
 
 from qgis.PyQt.QtCore import QSettings, QTranslator, QCoreApplication
 
+# Only light-weight modules are imported at startup. The openEO client,
+# owslib, requests etc. are imported once a connection is used.
 from .gui.browser.OpenEOItemProvider import OpenEOItemProvider
 from .utils.settings import SettingsPath, getOs
 from .utils.logging import Logging
 from .models.CredentialsModel import Credentials
 
+# Time in seconds that importing and initializing the plugin should take
+STARTUP_BUDGET = 0.25
+
 
 # noinspection PyPep8Naming
 def classFactory(iface):  # pylint: disable=invalid-name
@@ -22,9 +32,15 @@ def classFactory(iface):  # pylint: disable=invalid-name
     :param iface: A QGIS interface instance.
     :type iface: QgsInterface
     """
-    #
+    plugin = OpenEO(iface)
+
+    startupTime = time.perf_counter() - _IMPORT_START
+    message = f"Plugin loaded in {startupTime * 1000:.0f} ms"
+    if startupTime > STARTUP_BUDGET:
+        message += f", exceeding the budget of {STARTUP_BUDGET * 1000:.0f} ms"
+    plugin.logging.debug(message)
 
-    return OpenEO(iface)
+    return plugin
 
 
 class OpenEO:
@@ -60,13 +76,6 @@ class OpenEO:
             self.translator.load(locale_path)
             QCoreApplication.installTranslator(self.translator)
 
-        # initialize cache
-        cacheDir = self._getCacheDir()
-        os.makedirs(os.path.dirname(cacheDir), exist_ok=True)
-        browserViewFile = self._getBrowserViewFilePath()
-        with open(browserViewFile, "w") as fp:
-            fp.write(" ")
-
         # Declare instance attributes
         self.actions = []
         self.menu = self.tr("&openEO")
@@ -74,6 +83,12 @@ class OpenEO:
         self.PLUGIN_NAME = "openEO"
         self.PLUGIN_ENTRY_NAME = "openEO"
 
+        # created on first use, possibly by several background tasks at once
+        self.cacheDir = None
+        self.wmtsCache = None
+        self.uriPrefetcher = None
+        self._initLock = threading.RLock()
+
         # Check if plugin was started the first time in current QGIS session
         # Must be set in initGui() to survive plugin reloads
         self.first_start = None
@@ -164,6 +179,15 @@ class OpenEO:
         QgsApplication.instance().dataItemProviderRegistry().removeProvider(
             self.list_items_provider
         )
+        if self.uriPrefetcher is not None:
+            self.uriPrefetcher.cancel()
+        from .utils.sessionPool import closeSessions
+        from .utils.remoteAccess import resetRemoteAccessOptions
+
+        closeSessions()
+        resetRemoteAccessOptions()
+        # write pending changes of the saved logins
+        Credentials().flush()
 
     def run(self):
         """Run method that performs all the real work"""
@@ -199,7 +223,7 @@ class OpenEO:
     def clearSettings(self):
         settings = QgsSettings()
         settings.remove(SettingsPath.SAVED_CONNECTIONS.value)
-        settings.remove(SettingsPath.SAVED_LOGINS.value)
+        Credentials().clear()
         settings.remove(SettingsPath.PLUGIN_VERSION.value)
 
     def initSettings(self):
@@ -214,12 +238,19 @@ class OpenEO:
         old_version = (
             settings.value(SettingsPath.PLUGIN_VERSION.value) or "2.0-beta.2"
         )
-        Credentials().update(old_version)
-        settings.setValue(
-            SettingsPath.PLUGIN_VERSION.value, self.getPluginVersion()
-        )
+        new_version = self.getPluginVersion()
+        if old_version != new_version:
+            # migrate the saved logins once per version
+            Credentials().update(old_version)
+            settings.setValue(SettingsPath.PLUGIN_VERSION.value, new_version)
 
     def _getCacheDir(self):
+        with self._initLock:
+            if self.cacheDir is None:
+                self.cacheDir = self._findCacheDir()
+            return self.cacheDir
+
+    def _findCacheDir(self):
         osID = getOs()
         if osID == "ubuntu" or osID == "neon":
             # ubuntu's default browser does have very limited file access. hence the cache being created in the home directory to allow access to temporary html files
@@ -231,6 +262,44 @@ class OpenEO:
             )
         return os.path.join(cacheParentDirectory, "openeo-cache/")
 
+    def getConnectionCacheDir(self, connectionId):
+        return os.path.join(
+            self._getCacheDir(), "connections", str(connectionId)
+        )
+
+    def getMosaicDir(self):
+        """Returns the directory for the VRT mosaics of job results"""
+        return os.path.join(self._getCacheDir(), "mosaics")
+
+    def getWmtsCache(self):
+        """Returns the cache for WMTS capabilities shared by all items"""
+        with self._initLock:
+            if self.wmtsCache is None:
+                from .utils.responseCache import DEFAULT_CACHE_TTL
+                from .utils.wmts import CapabilitiesCache
+
+                ttl = QgsSettings().value(
+                    SettingsPath.CACHE_TTL.value, DEFAULT_CACHE_TTL, type=int
+                )
+                self.wmtsCache = CapabilitiesCache(
+                    os.path.join(self._getCacheDir(), "wmts"), ttl=ttl
+                )
+            return self.wmtsCache
+
+    def getUriPrefetcher(self):
+        """Returns the prefetcher for web map URIs shared by all items"""
+        with self._initLock:
+            if self.uriPrefetcher is None:
+                from .utils.uriPrefetcher import UriPrefetcher
+
+                self.uriPrefetcher = UriPrefetcher()
+            return self.uriPrefetcher
+
+    def isUriPrefetchEnabled(self):
+        return QgsSettings().value(
+            SettingsPath.PREFETCH_URIS.value, False, type=bool
+        )
+
     def _getBrowserViewFilePath(self):
         return os.path.join(self._getCacheDir(), "resourceInfo.html")
 
@@ -245,6 +314,7 @@ class OpenEO:
             html = html.replace(f"<!-- {key} -->", value)
 
         path = self._getBrowserViewFilePath()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
         url = "file://" + path
         with open(path, "w") as fp:
             fp.write(html)
@@ -0,0 +1,121 @@
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import Qt
+
+from ..utils.assetFilter import (
+    NO_ROLE,
+    AssetFilter,
+    getBands,
+    getFileType,
+    getRoles,
+)
+from ..utils.optimize import formatBytes
+
+MB = 1024 * 1024
+
+
+class AssetSelectionDialog(QtWidgets.QDialog):
+    """
+    Dialog to select the assets of job results to download by their roles,
+    file types, bands and size.
+    """
+
+    def __init__(self, assetItems, sizes, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Select Results to Download")
+        self.assetItems = assetItems
+        self.sizes = sizes
+
+        roles, fileTypes, bands = [], [], []
+        for item in assetItems:
+            for role in getRoles(item.asset):
+                if role not in roles:
+                    roles.append(role)
+            fileType = getFileType(item.asset)
+            if fileType not in fileTypes:
+                fileTypes.append(fileType)
+            for band in getBands(item.asset):
+                if band not in bands:
+                    bands.append(band)
+
+        # unselect the metadata, logs, thumbnails, etc. by default
+        self.roleList = self.createList(
+            roles, lambda role: role in ("data", NO_ROLE)
+        )
+        self.typeList = self.createList(fileTypes)
+        self.bandList = self.createList(bands)
+
+        self.sizeEdit = QtWidgets.QDoubleSpinBox()
+        self.sizeEdit.setDecimals(0)
+        self.sizeEdit.setMaximum(1e7)
+        self.sizeEdit.setSuffix(" MB")
+        self.sizeEdit.setSpecialValueText("No limit")
+        self.sizeEdit.valueChanged.connect(self.updateSummary)
+
+        self.summaryLabel = QtWidgets.QLabel()
+
+        form = QtWidgets.QFormLayout()
+        form.addRow("Roles", self.roleList)
+        form.addRow("File types", self.typeList)
+        if bands:
+            form.addRow("Bands", self.bandList)
+        form.addRow("Maximum file size", self.sizeEdit)
+
+        self.buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.StandardButton.Ok
+            | QtWidgets.QDialogButtonBox.StandardButton.Cancel
+        )
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(self.summaryLabel)
+        layout.addWidget(self.buttons)
+
+        self.updateSummary()
+
+    def createList(self, values, isChecked=lambda value: True):
+        widget = QtWidgets.QListWidget()
+        for value in values:
+            item = QtWidgets.QListWidgetItem(value)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(
+                Qt.CheckState.Checked
+                if isChecked(value)
+                else Qt.CheckState.Unchecked
+            )
+            widget.addItem(item)
+        widget.setMaximumHeight(120)
+        widget.itemChanged.connect(self.updateSummary)
+        return widget
+
+    def getChecked(self, widget):
+        return [
+            widget.item(i).text()
+            for i in range(widget.count())
+            if widget.item(i).checkState() == Qt.CheckState.Checked
+        ]
+
+    def getFilter(self):
+        maxSize = self.sizeEdit.value()
+        return AssetFilter(
+            roles=self.getChecked(self.roleList),
+            fileTypes=self.getChecked(self.typeList),
+            bands=self.getChecked(self.bandList)
+            if self.bandList.count()
+            else None,
+            maxSize=maxSize * MB if maxSize else None,
+            sizes=self.sizes,
+        )
+
+    def updateSummary(self):
+        filter = self.getFilter()
+        selected = len(filter.filterItems(self.assetItems))
+        total, unknown = filter.getTotalSize(self.assetItems)
+        summary = f"{selected} of {len(self.assetItems)} files selected, {formatBytes(total)}"
+        if unknown:
+            summary += f" and {unknown} files of unknown size"
+        self.summaryLabel.setText(summary)
+        self.buttons.button(
+            QtWidgets.QDialogButtonBox.StandardButton.Ok
+        ).setEnabled(selected > 0)
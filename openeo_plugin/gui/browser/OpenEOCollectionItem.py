@@ -12,7 +12,7 @@ from qgis.core import QgsMapLayerFactory
 from qgis.core import QgsApplication
 
 from .util import getSeparator
-from ...utils.wmts import WebMapTileService
+from ...utils.loadTask import LoadTask
 
 
 class OpenEOCollectionItem(QgsDataItem):
@@ -42,6 +42,7 @@ class OpenEOCollectionItem(QgsDataItem):
         self.plugin = parent.plugin
         self.uris = []
         self.uriInaccessible = False  # assume URL works until proven otherwise
+        self.revalidateTask = None
 
         # Has no children, set as populated to avoid the expand arrow
         self.setState(QgsDataItem.State.Populated)
@@ -59,6 +60,25 @@ class OpenEOCollectionItem(QgsDataItem):
             else QgsApplication.getThemeIcon("mIconTiledScene.svg")
         )
 
+    def getId(self):
+        return self.collection["id"]
+
+    def setCollection(self, collection):
+        """Updates the item with the collection from a fresh listing"""
+        if collection == self.collection:
+            return
+        self.collection = collection
+        self.uris = []
+        self.uriInaccessible = False
+        self._init()
+        self.dataChanged.emit(self)
+
+    def updateName(self):
+        self.setName(self.name())
+        # the URIs are named after the item, so they need to be recreated
+        self.uris = []
+        self.dataChanged.emit(self)
+
     def getWebMapLinks(self):
         """
         helper-function that determines whether or not a collection of this
@@ -109,7 +129,10 @@ class OpenEOCollectionItem(QgsDataItem):
     def getConnection(self):
         return self.parent().getConnection()
 
-    def createBaseUri(self, link):
+    def getCache(self):
+        return self.parent().getCache()
+
+    def createBaseUri(self, link, name=None):
         uri = QgsMimeDataUtils.Uri()
         uri.layerType = QgsMapLayerFactory.typeToString(Qgis.LayerType.Raster)
         uri.providerKey = "wms"
@@ -117,42 +140,44 @@ class OpenEOCollectionItem(QgsDataItem):
         uri.supportedFormats = []
         uri.supportedCrs = []
 
-        uri.name = self.layerName()
+        uri.name = name or self.layerName()
         title = link.get("title") or ""
         if len(title) > 0 and title != uri.name:
             uri.name += f" - {title}"
 
         return uri
 
-    def createXYZ(self, link):
-        uri = self.createBaseUri(link)
+    def createXYZ(self, link, name=None):
+        uri = self.createBaseUri(link, name)
         uri.supportedCrs = ["EPSG:3857"]
         uri.uri = f"type=xyz&url={link['href']}/" + quote("{z}/{y}/{x}")
         return uri
 
-    def createWMTS(self, link):
+    def createWMTS(self, link, name=None):
+        """Returns the URIs for the WMTS layers or None if the service
+        can't be accessed"""
         # todo: Currently only supports KVP encoding, not REST
         # todo: does not support wmts:dimensions
+        layers = link.get("wmts:layer")
+        if layers:
+            if isinstance(layers, str):
+                layers = [layers]
+            else:
+                layers = list(layers)
+
         try:
             wmtsUrl = link["href"] + "?service=wmts&request=getCapabilities"
-            wmts = WebMapTileService(wmtsUrl)
+            # the document is shared, only the requested layers are selected
+            wmts = self.plugin.getWmtsCache().getSummary(wmtsUrl, layers)
         except Exception as e:
             self.plugin.logging.error(
                 f"WMTS service {link['href']} can't be accessed.",
                 error=e,
             )
             # would be good to test for a 403 here but the returned ows exception doesnt appear to hold that info.
-            self.uriInaccessible = True
-            self._init()
-            return []
+            return None
 
-        layers = link.get("wmts:layer")
-        if layers:
-            if isinstance(layers, str):
-                layers = [layers]
-            else:
-                layers = list(layers)
-        else:
+        if not layers:
             layers = list(wmts.contents)
 
         mediaType = link.get("type")
@@ -162,7 +187,7 @@ class OpenEOCollectionItem(QgsDataItem):
 
         uris = []
         for layer in layers:
-            uri = self.createBaseUri(link)
+            uri = self.createBaseUri(link, name)
 
             # Get layer info from WMTS capabilities
             lyr = wmts.contents.get(layer)
@@ -198,33 +223,73 @@ class OpenEOCollectionItem(QgsDataItem):
 
         return uris
 
-    def createUris(self, link):
+    def createUris(self, link, name=None):
         uris = []
         rel = link.get("rel") or ""
         if rel == "xyz":
-            uris.append(self.createXYZ(link))
+            uris.append(self.createXYZ(link, name))
         elif rel == "wmts":
-            uris.extend(self.createWMTS(link))
+            wmtsUris = self.createWMTS(link, name)
+            if wmtsUris is None:
+                return None
+            uris.extend(wmtsUris)
 
         return uris
 
-    def mimeUris(self):
-        if not self.hasPreview() or len(self.uris) > 0:
-            return self.uris
-
-        QApplication.setOverrideCursor(Qt.CursorShape.BusyCursor)
-
+    def resolveUris(self, name):
+        """Creates the URIs for all web map links and checks whether a
+        service is inaccessible. Doesn't modify the item, so it can run in
+        a background thread."""
+        uris = []
+        inaccessible = False
         for link in self.links:
             try:
-                uris = self.createUris(link)
-                self.uris.extend(uris)
+                linkUris = self.createUris(link, name)
+                if linkUris is None:
+                    inaccessible = True
+                else:
+                    uris.extend(linkUris)
             except Exception as e:
                 self.plugin.logging.error(
                     f"Can't visualize the mapping service {link['href']} for collection {self.collection['id']}.",
                     error=e,
                 )
+        return uris, inaccessible
+
+    def applyUris(self, result):
+        uris, inaccessible = result
+        self.uris = uris
+        if inaccessible:
+            self.uriInaccessible = True
+            self._init()
+
+    def prefetchUris(self, priority=0):
+        """Resolves the URIs in the background, so that they are available
+        right away when the collection is dragged or added to the project"""
+        if not self.hasPreview() or len(self.uris) > 0:
+            return
+        name = self.layerName()
+        parent = self.parent()
+        generation = parent.prefetchGeneration
+
+        def resolve():
+            if generation != parent.prefetchGeneration:
+                return None  # the items have been replaced meanwhile
+            return self.resolveUris(name)
+
+        self.plugin.getUriPrefetcher().enqueue(
+            resolve, self.applyUris, priority
+        )
+
+    def mimeUris(self):
+        if not self.hasPreview() or len(self.uris) > 0:
+            return self.uris
 
-        QApplication.restoreOverrideCursor()
+        QApplication.setOverrideCursor(Qt.CursorShape.BusyCursor)
+        try:
+            self.applyUris(self.resolveUris(self.layerName()))
+        finally:
+            QApplication.restoreOverrideCursor()
 
         return self.uris
 
@@ -249,10 +314,40 @@ class OpenEOCollectionItem(QgsDataItem):
             f"/collections/{self.collection['id']}"
         )
 
+    def describeCollection(self):
+        """Returns the cached collection metadata if available and requests
+        it from the server otherwise. Stale metadata gets revalidated in the
+        background."""
+        cache = self.getCache()
+        name = f"collection-{self.collection['id']}"
+        path = f"/collections/{self.collection['id']}"
+        entry = cache.get(name)
+        if entry is None:
+            entry, _ = cache.fetch(self.getConnection(), path, name)
+        elif not cache.isFresh(entry) and self.revalidateTask is None:
+            connection = self.getConnection()
+
+            def on_done(*args):
+                self.revalidateTask = None
+
+            self.revalidateTask = LoadTask(
+                f"Revalidate collection {self.collection['id']}",
+                lambda: cache.fetch(connection, path, name),
+            )
+            self.revalidateTask.loaded.connect(on_done)
+            self.revalidateTask.failed.connect(on_done)
+            self.revalidateTask.start()
+        return entry["data"]
+
     def viewProperties(self):
-        collection = self.getConnection().describe_collection(
-            self.collection.get("id")
-        )
+        try:
+            collection = self.describeCollection()
+        except Exception as e:
+            self.plugin.logging.error(
+                f"Can't load details for collection {self.collection['id']}.",
+                error=e,
+            )
+            return
         self.plugin.showTempFileInWebBrowser(
             "collectionProperties", {"collection": collection}
         )
@@ -5,9 +5,19 @@ from qgis.PyQt.QtGui import QIcon
 
 from qgis.core import QgsDataCollectionItem
 from qgis.core import QgsApplication
+from qgis.core import QgsSettings
 
-from .util import getSeparator
+from .util import (
+    canUpdateChildren,
+    getSeparator,
+    reconcileChildren,
+    setBackgroundLoading,
+    setChildren,
+)
 from .OpenEOCollectionItem import OpenEOCollectionItem
+from .OpenEOLoadingItem import OpenEOLoadingItem
+from ...utils.loadTask import LoadTask
+from ...utils.settings import SettingsPath
 
 
 class OpenEOCollectionsGroupItem(QgsDataCollectionItem):
@@ -33,37 +43,174 @@ class OpenEOCollectionsGroupItem(QgsDataCollectionItem):
         )
         self.plugin = parent.plugin
         self.showTitles = True
+        self.forceReload = False
+        self.revalidateTask = None
+        self.loadTask = None
+        self.prefetchGeneration = 0
         self.setIcon(QgsApplication.getThemeIcon("mIconFolder.svg"))
+        setBackgroundLoading(self)
 
-    def getCollections(self):
+    def getCollections(self, cache, forceReload=False):
+        """Returns the cached list of collections and whether it is stale.
+        Requests it from the server only if nothing is cached yet or if a
+        reload has been requested. Runs in a background task."""
+        entry = cache.get("collections")
+        stale = False
         try:
-            collections = self.getConnection().list_collections()
-            return collections
+            if entry is None or forceReload:
+                entry, _ = cache.fetch(
+                    self.getConnection(), "/collections", "collections"
+                )
+            else:
+                stale = not cache.isFresh(entry)
         except Exception as e:
             self.plugin.logging.error(
                 "Can't load list of collections.", error=e
             )
-        return []
+            if entry is None:
+                return [], False
+        return entry["data"].get("collections", []), stale
+
+    def revalidate(self):
+        if self.revalidateTask is not None:
+            return
+
+        cache = self.getCache()
+        connection = self.getConnection()
+
+        def on_loaded(result):
+            self.revalidateTask = None
+            entry, changed = result
+            if changed and canUpdateChildren(self):
+                self.updateCollections(entry["data"].get("collections", []))
+            elif changed:
+                self.refresh()
+
+        def on_failed(e):
+            self.revalidateTask = None
+            self.plugin.logging.debug(
+                "Can't revalidate list of collections.", error=e
+            )
+
+        self.revalidateTask = LoadTask(
+            "Revalidate collections",
+            lambda: cache.fetch(connection, "/collections", "collections"),
+        )
+        self.revalidateTask.loaded.connect(on_loaded)
+        self.revalidateTask.failed.connect(on_failed)
+        self.revalidateTask.start()
+
+    def refresh(self, force=False):
+        if not canUpdateChildren(self):
+            self.forceReload = force
+            self.prefetchGeneration += 1
+            self.depopulate()
+            return super().refresh()
 
-    def refresh(self):
-        self.depopulate()
-        super().refresh()
+        cache = self.getCache()
+        connection = self.getConnection()
+
+        def load():
+            if force:
+                entry, _ = cache.fetch(
+                    connection, "/collections", "collections"
+                )
+                return entry["data"].get("collections", []), False
+            return self.getCollections(cache)
+
+        def on_loaded(result):
+            if self.loadTask is not task:
+                return
+            self.loadTask = None
+            collections, stale = result
+            self.updateCollections(collections)
+            if stale:
+                self.revalidate()
+
+        def on_failed(e):
+            if self.loadTask is task:
+                self.loadTask = None
+                self.plugin.logging.error(
+                    "Can't refresh list of collections.", error=e
+                )
+
+        task = LoadTask("Refresh collections", load)
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        self.loadTask = task.start()
+
+    def updateCollections(self, collections):
+        """Updates the children in place from a fresh list of collections"""
+        reconcileChildren(
+            self,
+            [(collection["id"], collection) for collection in collections],
+            lambda collection, index: OpenEOCollectionItem(
+                parent=self, collection=collection
+            ),
+            lambda item, collection, index: item.setCollection(collection),
+        )
+        if self.plugin.isUriPrefetchEnabled():
+            self.prefetchUris()
 
     def createChildren(self):
-        items = []
-        collections = self.getCollections()
-        for collection in collections:
-            items.append(
-                OpenEOCollectionItem(
-                    parent=self,
-                    collection=collection,
+        cache = self.getCache()
+        forceReload = self.forceReload
+        self.forceReload = False
+
+        def on_loaded(result):
+            if self.loadTask is not task:
+                return  # outdated, the group has been refreshed meanwhile
+            self.loadTask = None
+            collections, stale = result
+            items = []
+            for collection in collections:
+                items.append(
+                    OpenEOCollectionItem(
+                        parent=self,
+                        collection=collection,
+                    )
                 )
-            )
-        return items
+            setChildren(self, items)
+            if self.plugin.isUriPrefetchEnabled():
+                self.prefetchUris(items)
+            if stale:
+                self.revalidate()
+
+        def on_failed(e):
+            if self.loadTask is task:
+                self.loadTask = None
+                setChildren(self, [])
+                self.plugin.logging.error(
+                    "Can't load list of collections.", error=e
+                )
+
+        task = LoadTask(
+            "Load collections",
+            lambda: self.getCollections(cache, forceReload),
+        )
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        self.loadTask = task.start()
+
+        return [OpenEOLoadingItem(self)]
+
+    def prefetchUris(self, items=None):
+        """Queues the web map URIs of the collections for prefetching in
+        the order in which they are listed in the browser"""
+        if items is None:
+            items = self.children()
+        row = 0
+        for item in items:
+            if isinstance(item, OpenEOCollectionItem):
+                item.prefetchUris(priority=row)
+                row += 1
 
     def getConnection(self):
         return self.parent().getConnection()
 
+    def getCache(self):
+        return self.parent().getCache()
+
     def actions(self, parent):
         actions = []
 
@@ -72,7 +219,7 @@ class OpenEOCollectionsGroupItem(QgsDataCollectionItem):
             "Refresh",
             parent,
         )
-        action_refresh.triggered.connect(self.refresh)
+        action_refresh.triggered.connect(lambda: self.refresh(force=True))
         actions.append(action_refresh)
 
         actions.append(getSeparator(parent))
@@ -89,8 +236,32 @@ class OpenEOCollectionsGroupItem(QgsDataCollectionItem):
         action_name.triggered.connect(self.toggleShowTitles)
         actions.append(action_name)
 
+        action_prefetch = QAction(
+            QgsApplication.getThemeIcon(
+                "algorithms/mAlgorithmCheckGeometry.svg"
+            )
+            if self.plugin.isUriPrefetchEnabled()
+            else QIcon(),
+            "Prefetch map previews",
+            parent,
+        )
+        action_prefetch.triggered.connect(self.togglePrefetch)
+        actions.append(action_prefetch)
+
         return actions
 
     def toggleShowTitles(self):
         self.showTitles = not self.showTitles
-        self.refresh()
+        # update the labels in place instead of reloading the collections
+        self.prefetchGeneration += 1
+        for item in self.children():
+            if isinstance(item, OpenEOCollectionItem):
+                item.updateName()
+        if self.plugin.isUriPrefetchEnabled():
+            self.prefetchUris()
+
+    def togglePrefetch(self):
+        enabled = not self.plugin.isUriPrefetchEnabled()
+        QgsSettings().setValue(SettingsPath.PREFETCH_URIS.value, enabled)
+        if enabled:
+            self.prefetchUris()
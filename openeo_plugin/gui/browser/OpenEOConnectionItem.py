@@ -1,20 +1,30 @@
 # -*- coding: utf-8 -*-
 import openeo
+import threading
+import time
 import webbrowser
-import datetime
 
-from qgis.PyQt.QtCore import Qt
+from qgis.PyQt.QtCore import Qt, QThread, QTimer, pyqtSignal
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QAction, QApplication
 
-from qgis.core import QgsApplication, QgsDataCollectionItem
+from qgis.core import QgsApplication, QgsDataCollectionItem, QgsSettings
 
-from .util import getSeparator
+from .util import getSeparator, setBackgroundLoading, setChildren
+from .OpenEOLoadingItem import OpenEOLoadingItem
 from .OpenEOJobsGroupItem import OpenEOJobsGroupItem
 from .OpenEOServicesGroupItem import OpenEOServicesGroupItem
 from .OpenEOCollectionsGroupItem import OpenEOCollectionsGroupItem
 from ..login_dialog import LoginDialog
-from ...models.CredentialsModel import Credentials
+from ...models.CredentialsModel import Credentials, parseJWT
+from ...utils.loadTask import LoadTask
+from ...utils.responseCache import ResponseCache, DEFAULT_CACHE_TTL
+from ...utils.jobIndex import JobIndex
+from ...utils.settings import SettingsPath
+
+
+# Renew access tokens this many seconds before they expire
+TOKEN_RENEWAL_MARGIN = 60
 
 
 class OpenEOConnectionItem(QgsDataCollectionItem):
@@ -24,8 +34,15 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
      - OpenEOCollectionsGroupItem
      - OpenEo_batchjob_group_item
      - OpenEo_services_group_item
+
+    The authentication state is derived from the expiry of the access token
+    and from 401 responses, so checking it never needs a request. Access
+    tokens are renewed in the background shortly before they expire.
     """
 
+    # emitted from any thread, handled on the main thread
+    authStateChanged = pyqtSignal()
+
     def __init__(self, model, parent, connection=None):
         """Constructor.
 
@@ -44,37 +61,72 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
             self, parent, model.name, parent.plugin.PLUGIN_ENTRY_NAME
         )
         self.setIcon(QgsApplication.getThemeIcon("mIconCloud.svg"))
-        self.connection = connection
+        self.connection = None
         self.plugin = parent.plugin
         self.model = model
-        self.lastAuthCheck = datetime.datetime.min
-        self.authenticated = False
+        self.authRejected = False
         self.forcedLogout = False
         self.loginStarted = False
-
-        self.authenticateStored()
+        self.loginRestored = False
+        self.restoreTask = None
+        self.cache = None
+        self.jobIndex = None
+        self.loadTask = None
+        self.connectionLock = threading.Lock()
+        self.authLock = threading.RLock()
+        self.renewTask = None
+        # with the item as parent, the timer moves to the main thread with it
+        self.renewTimer = QTimer(self)
+        self.renewTimer.setSingleShot(True)
+        self.renewTimer.timeout.connect(self.renewToken)
+        self.authStateChanged.connect(self.onAuthStateChanged)
+        setBackgroundLoading(self)
+
+        if connection:
+            self.setConnection(connection)
 
     def createChildren(self):
-        capabilities = self.getConnection().capabilities()
-        items = []
+        def on_loaded(capabilities):
+            if self.loadTask is not task:
+                return  # outdated, the connection has been refreshed
+            self.loadTask = None
+            items = []
 
-        self.collectionsGroup = OpenEOCollectionsGroupItem(self)
-        items.append(self.collectionsGroup)
+            self.collectionsGroup = OpenEOCollectionsGroupItem(self)
+            items.append(self.collectionsGroup)
 
-        if capabilities.supports_endpoint("/services"):
-            self.servicesGroup = OpenEOServicesGroupItem(self)
-            items.append(self.servicesGroup)
+            if capabilities.supports_endpoint("/services"):
+                self.servicesGroup = OpenEOServicesGroupItem(self)
+                items.append(self.servicesGroup)
 
-        if capabilities.supports_endpoint("/jobs"):
-            self.jobsGroup = OpenEOJobsGroupItem(self)
-            items.append(self.jobsGroup)
+            if capabilities.supports_endpoint("/jobs"):
+                self.jobsGroup = OpenEOJobsGroupItem(self)
+                items.append(self.jobsGroup)
 
-        return items
+            setChildren(self, items)
+
+        def on_failed(e):
+            if self.loadTask is task:
+                self.loadTask = None
+                setChildren(self, [])
+                self.plugin.logging.error(
+                    f"Can't connect to {self.model.name}.", error=e
+                )
+
+        task = LoadTask(
+            f"Connect to {self.model.name}",
+            lambda: self.getConnection().capabilities(),
+        )
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        self.loadTask = task.start()
+
+        return [OpenEOLoadingItem(self)]
 
     def refresh(self):
-        self.isAuthenticated(forceRefresh=True)
+        self.updateIcon()
         if hasattr(self, "collectionsGroup"):
-            self.collectionsGroup.refresh()
+            self.collectionsGroup.refresh(force=True)
         if hasattr(self, "servicesGroup"):
             self.servicesGroup.refresh()
         if hasattr(self, "jobsGroup"):
@@ -82,6 +134,8 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
 
     def remove(self):
         self.deleteLogin()
+        self.getCache().clear()
+        self.getJobIndex().clear()
         self.parent().removeConnection(self)
 
     def authenticate(self):
@@ -90,6 +144,7 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
         self.forcedLogout = False
 
         if self.authenticateStored():
+            self.loginRestored = True
             self.refresh()
             return
 
@@ -128,6 +183,9 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
                         activeAuthProvider["id"]
                     )
                     Credentials().add(credentials)
+                # a later restore must not replace this login
+                self.loginRestored = True
+                self.onAuthenticated()
                 self.refresh()
         except Exception as e:
             self.plugin.logging.error("Login failed.", error=e)
@@ -135,6 +193,49 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
         finally:
             self.loginStarted = False
 
+    def restoreLogin(self):
+        """Restores the stored login in a background task, so that the
+        connections don't block the browser while their tokens are
+        refreshed. The icon shows the state once it is known."""
+        if self.loginRestored or self.restoreTask is not None:
+            return
+
+        def on_done(*args):
+            self.restoreTask = None
+            self.updateIcon()
+
+        self.restoreTask = LoadTask(
+            f"Log in to {self.model.name}", self.ensureLoginRestored
+        )
+        self.restoreTask.loaded.connect(on_done)
+        self.restoreTask.failed.connect(on_done)
+        self.restoreTask.start()
+        self.updateIcon()
+
+    def ensureLoginRestored(self):
+        """Restores the stored login when the connection is used first.
+        Waits for a login that is being restored in another thread. A login
+        that couldn't be restored is tried again on the next use."""
+        with self.authLock:
+            if self.loginRestored:
+                return
+            if Credentials().get(self.model.id) is None:
+                self.loginRestored = True  # nothing to restore
+            elif self.authenticateStored():
+                self.loginRestored = True
+
+    def isRestoringLogin(self):
+        return self.restoreTask is not None
+
+    def updateIcon(self):
+        if self.isRestoringLogin():
+            icon = "mTaskRunning.svg"
+        elif self.hasValidToken():
+            icon = "unlocked.svg"
+        else:
+            icon = "mIconCloud.svg"
+        self.setIcon(QgsApplication.getThemeIcon(icon))
+
     def authenticateStored(self):
         login = Credentials().get(self.model.id)
         if login:
@@ -144,6 +245,7 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
                     creds["username"],
                     creds["password"],
                 )
+                self.onAuthenticated()
                 return True
             elif login.loginType == "oidc":
                 creds = login.credentials
@@ -154,7 +256,8 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
                     self.getConnection().authenticate_oidc_refresh_token(
                         provider_id=provider_id
                     )  # try logging in with refresh token
-                    if self.isAuthenticated():
+                    self.onAuthenticated()
+                    if self.hasValidToken():
                         # check that refresh token auth was successful
                         return True
                     else:
@@ -168,23 +271,86 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
                     )
         return False
 
-    def isAuthenticated(self, forceRefresh=False):
-        authCacheAge = datetime.timedelta(seconds=60)
-        maximumTime = self.lastAuthCheck + authCacheAge
-        if (datetime.datetime.now() > maximumTime) or forceRefresh:
-            try:
-                self.lastAuthCheck = datetime.datetime.now()
-                account = self.getConnection().describe_account()
-                if account:
-                    self.authenticated = True
-                else:
-                    self.authenticated = False
-            except Exception as e:
-                self.authenticated = False
-                self.plugin.logging.debug(
-                    "Can't check authentication status.", error=e
-                )
-        return self.authenticated
+    def isAuthenticated(self):
+        """Checks the authentication state without sending a request.
+        Background tasks wait for the stored login to be restored first. On
+        the main thread, the login is restored by a background task instead
+        and the current state is returned, so the browser doesn't freeze."""
+        if QThread.currentThread() == QgsApplication.instance().thread():
+            if not self.loginRestored:
+                self.restoreLogin()
+        else:
+            self.ensureLoginRestored()
+        return self.hasValidToken()
+
+    def hasValidToken(self):
+        """Checks whether the connection has an access token that hasn't
+        expired and hasn't been rejected by the server"""
+        if self.authRejected or self.getAccessToken() is None:
+            return False
+        expiry = self.getTokenExpiry()
+        # opaque tokens are valid until the server rejects them
+        return expiry is None or time.time() < expiry
+
+    def getAccessToken(self):
+        # the openEO client stores the token as "<type>/<provider>/<token>"
+        bearer = getattr(
+            getattr(self.connection, "auth", None), "bearer", None
+        )
+        if not bearer:
+            return None
+        return bearer.split("/", 2)[-1] or None
+
+    def getTokenExpiry(self):
+        payload = parseJWT(self.getAccessToken())
+        if not payload or "exp" not in payload:
+            return None
+        return payload["exp"]
+
+    def onAuthenticated(self):
+        """Called after the connection received a new access token"""
+        self.authRejected = False
+        self.authStateChanged.emit()
+
+    def onResponse(self, response, *args, **kwargs):
+        """Response hook of the connection's HTTP session"""
+        if "Authorization" not in response.request.headers:
+            return response
+        # the openEO client may renew the token itself and repeat requests
+        rejected = response.status_code == 401
+        if response.status_code < 400 or rejected:
+            if rejected != self.authRejected:
+                self.authRejected = rejected
+                self.authStateChanged.emit()
+        return response
+
+    def onAuthStateChanged(self):
+        self.updateIcon()
+        self.scheduleRenewal()
+
+    def scheduleRenewal(self):
+        self.renewTimer.stop()
+        expiry = self.getTokenExpiry()
+        if expiry is None or self.authRejected:
+            return
+        delay = max(0, expiry - time.time() - TOKEN_RENEWAL_MARGIN)
+        self.renewTimer.start(int(delay * 1000))
+
+    def renewToken(self):
+        """Renews the access token in the background"""
+        if self.forcedLogout or self.renewTask is not None:
+            return
+
+        def on_done(*args):
+            self.renewTask = None
+            self.updateIcon()
+
+        self.renewTask = LoadTask(
+            f"Renew login for {self.model.name}", self.authenticateStored
+        )
+        self.renewTask.loaded.connect(on_done)
+        self.renewTask.failed.connect(on_done)
+        self.renewTask.start()
 
     # todo: remove this when the openEO Python client has been updated to support this method
     # see https://github.com/Open-EO/openeo-python-client/pull/826
@@ -224,9 +390,34 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
         return providers
 
     def getConnection(self):
-        if not self.connection:
-            self.connection = self.model.connect()
-        return self.connection
+        # may be called from several background tasks at the same time
+        with self.connectionLock:
+            if not self.connection:
+                self.setConnection(self.model.connect())
+            return self.connection
+
+    def setConnection(self, connection):
+        self.connection = connection
+        self.authRejected = False
+        # watch the normal traffic for rejected access tokens
+        connection.session.hooks["response"].append(self.onResponse)
+
+    def getCache(self):
+        if not self.cache:
+            ttl = QgsSettings().value(
+                SettingsPath.CACHE_TTL.value, DEFAULT_CACHE_TTL, type=int
+            )
+            self.cache = ResponseCache(
+                self.plugin.getConnectionCacheDir(self.model.id), ttl=ttl
+            )
+        return self.cache
+
+    def getJobIndex(self):
+        if not self.jobIndex:
+            self.jobIndex = JobIndex(
+                self.plugin.getConnectionCacheDir(self.model.id)
+            )
+        return self.jobIndex
 
     def deleteLogin(self):
         Credentials().remove(self.model.id)
@@ -235,7 +426,10 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
         self.forcedLogout = True
         self.loginStarted = False
         self.deleteLogin()
+        # the jobs of the account shouldn't be searchable anymore
+        self.getJobIndex().clear()
         # refresh connection
+        self.renewTimer.stop()
         self.connection = None
         self.connection = self.getConnection()
         self.refresh()
@@ -257,7 +451,17 @@ class OpenEOConnectionItem(QgsDataCollectionItem):
     def actions(self, parent):
         actions = []
 
-        if not self.isAuthenticated():
+        # starts restoring the stored login if it hasn't been restored yet
+        authenticated = self.isAuthenticated()
+        if self.isRestoringLogin():
+            action_restoring = QAction(
+                QgsApplication.getThemeIcon("mTaskRunning.svg"),
+                "Logging in...",
+                parent,
+            )
+            action_restoring.setEnabled(False)
+            actions.append(action_restoring)
+        elif not authenticated:
             action_authenticate = QAction(
                 QgsApplication.getThemeIcon("locked.svg"),
                 "Log In (Authenticate)",
@@ -1,19 +1,33 @@
 # -*- coding: utf-8 -*-
 from collections.abc import Iterable
-import dateutil.parser
 import json
 import pathlib
+import shutil
 
 from qgis.PyQt.QtCore import Qt, QUrl
 from qgis.PyQt.QtWidgets import QAction, QApplication
-from qgis.PyQt.QtGui import QDesktopServices
+from qgis.PyQt.QtGui import QDesktopServices, QIcon
 
-from qgis.core import Qgis, QgsDataItem, QgsApplication, QgsProject
+from qgis.core import (
+    Qgis,
+    QgsApplication,
+    QgsDataItem,
+    QgsProject,
+    QgsSettings,
+)
 
-from .util import getSeparator
+from .util import createSortKeys, getSeparator, getSortKey
 from .OpenEOStacAssetItem import OpenEOStacAssetItem
 from ..directory_dialog import DirectoryDialog
-from ...utils.downloadTask import DownloadJobAssetsTask
+from ..extent_dialog import ExtentDialog
+from ..asset_selection_dialog import AssetSelectionDialog
+from ...utils.clipTask import ClipAssetsTask
+from ...utils.assetFilter import getAssetSizes
+from ...utils.downloadTask import DownloadJobAssetsTask, getDownloadConcurrency
+from ...utils.loadTask import LoadTask
+from ...utils.layerTask import CreateLayersTask
+from ...utils.optimize import formatBytes, getCompression, isOptimizeEnabled
+from ...utils.settings import SettingsPath
 
 mayHaveResults = ["running", "canceled", "finished", "error"]
 
@@ -49,6 +63,7 @@ class OpenEOJobItem(QgsDataItem):
         self.results = None
         self.plugin = parent.plugin
         self.index = index
+        self.selectTask = None
 
         self.assetItems = []
 
@@ -56,6 +71,22 @@ class OpenEOJobItem(QgsDataItem):
 
         self.updateFromData()
 
+    def getId(self):
+        return self.job["id"]
+
+    def setJob(self, job, index):
+        """Updates the item with the job metadata from a fresh listing"""
+        statusChanged = job.get("status") != self.getStatus()
+        # keep details that are only available from describe()
+        self.job = {**self.job, **job}
+        self.index = index
+        self.updateFromData()
+        self.dataChanged.emit(self)
+        if statusChanged:
+            # the results may have changed with the status
+            self.results = None
+            self.depopulate()
+
     def getJobClass(self):
         return self.getConnection().job(self.job["id"])
 
@@ -72,22 +103,10 @@ class OpenEOJobItem(QgsDataItem):
         status = self.getStatus()
         statusString = f"({status}) "
         self.setName(statusString + name)
+        self.sortKeys = createSortKeys(self.job, self.getTitle(), self.index)
 
     def sortKey(self):
-        sortBy = self.parent().sortChildrenBy
-        if sortBy == "title":
-            return self.getTitle().lower()
-        elif sortBy == "oldest" or sortBy == "newest":
-            try:
-                created = self.job.get("created", "")
-                timestamp = dateutil.parser.isoparse(created).timestamp()
-                if sortBy == "newest":
-                    timestamp *= -1
-                return int(timestamp)
-            except Exception:
-                return 0
-        else:  # default, keep initial backend order
-            return self.index
+        return getSortKey(self.sortKeys, self.parent().sortChildrenBy)
 
     def hasDragEnabled(self):
         return False
@@ -193,41 +212,66 @@ class OpenEOJobItem(QgsDataItem):
             return "unknown"
         return self.job.get("status", "unknown")
 
+    def isActive(self):
+        return self.getStatus() in isActiveStates
+
     def getTitle(self):
         if not self.job:
             return "n/a"
         return self.job.get("title") or self.job.get("id")
 
-    def addResultsToProject(self):
-        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-        try:
-            self.populateAssetItems()
-            # create group
-            jobName = self.getTitle()
-            project = QgsProject.instance()
-            group = project.layerTreeRoot().insertGroup(0, jobName)
-
-            # create layers and add them to group
-            for asset in self.assetItems:
-                layers, errored = asset.createLayers(addToProject=False)
-                for layer in layers:
-                    # add to project without showing
-                    project.addMapLayer(layer, False)
-                    # add to the group
-                    group.addLayer(layer)
-        except Exception as e:
-            self.plugin.logging.error(
-                f"Can't add results to project for job {self.getTitle()}.",
-                error=e,
-            )
-        finally:
-            QApplication.restoreOverrideCursor()
-            if errored:
-                self.plugin.logging.warning(
-                    f"{errored} assets for job {self.getTitle()} can't be visualized"
+    def addResultsToProject(self, mosaic=False):
+        # Store references for signal handlers
+        plugin = self.plugin
+        jobName = self.getTitle()
+
+        # the layers are added in batches once they are ready, the group is
+        # created with the first batch so that no empty group is left behind
+        project = QgsProject.instance()
+        group = None
+
+        layersTask = CreateLayersTask(
+            f"Add job results to project: {jobName}",
+            self,
+            mosaicDir=plugin.getMosaicDir() if mosaic else None,
+        )
+
+        def on_layers_created(layers):
+            nonlocal group
+            if not layers:
+                return
+            if group is None:
+                group = project.layerTreeRoot().insertGroup(0, jobName)
+            for layer in layers:
+                # add to project without showing
+                project.addMapLayer(layer, False)
+                # add to the group
+                group.addLayer(layer)
+
+        def on_complete():
+            if layersTask.errors:
+                plugin.logging.warning(
+                    f"{layersTask.errors} assets for job {jobName} can't be visualized"
                 )
 
-    def saveResultsTo(self):
+        def on_error():
+            if layersTask.canceled:
+                plugin.logging.info(
+                    f"Adding results to project canceled: {jobName}"
+                )
+            else:
+                plugin.logging.error(
+                    f"Can't add results to project for job {jobName}.",
+                    error=layersTask.exception,
+                )
+
+        layersTask.layersCreated.connect(on_layers_created)
+        layersTask.taskCompleted.connect(on_complete)
+        layersTask.taskTerminated.connect(on_error)
+
+        QgsApplication.taskManager().addTask(layersTask)
+
+    def saveResultsTo(self, sync=False, assetFilter=None):
         downloadPath = pathlib.Path.home() / "Downloads"
 
         # prepare file dialog
@@ -239,13 +283,78 @@ class OpenEOJobItem(QgsDataItem):
         if not dir:
             return
 
+        if assetFilter is not None and not self.hasSpaceFor(dir, assetFilter):
+            return
+
+        self.queueDownloadTask(dir, sync=sync, assetFilter=assetFilter)
+
+    def selectResultsToSave(self):
+        """Asks which assets to download, based on their metadata and
+        sizes, before asking for the directory"""
+        plugin = self.plugin
+        jobName = self.getTitle()
+
+        def load():
+            self.populateAssetItems()
+            sizes = getAssetSizes(self.assetItems, getDownloadConcurrency())
+            return self.assetItems, sizes
+
+        def on_loaded(result):
+            self.selectTask = None
+            assetItems, sizes = result
+            if not assetItems:
+                plugin.logging.warning(f"Job {jobName} has no results.")
+                return
+            dialog = AssetSelectionDialog(assetItems, sizes)
+            if dialog.exec():
+                self.saveResultsTo(assetFilter=dialog.getFilter())
+
+        def on_failed(e):
+            self.selectTask = None
+            plugin.logging.error(
+                f"Can't load results for job {jobName}.", error=e
+            )
+
+        task = LoadTask(f"Load results of batch job {jobName}", load)
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        # keep a reference until the task has finished
+        self.selectTask = task.start()
+
+    def hasSpaceFor(self, dir, assetFilter):
+        total, unknown = assetFilter.getTotalSize(self.assetItems)
+        try:
+            free = shutil.disk_usage(dir).free
+        except OSError:
+            return True  # e.g. the directory doesn't exist yet
+        if total > free:
+            self.plugin.logging.error(
+                f"Not enough disk space in {dir}: the selected results need {formatBytes(total)}, but only {formatBytes(free)} are free."
+            )
+            return False
+        if unknown:
+            self.plugin.logging.info(
+                f"The size of {unknown} selected files is unknown, the free disk space can't be fully checked."
+            )
+        return True
+
+    def syncResultsTo(self):
+        self.saveResultsTo(sync=True)
+
+    def queueDownloadTask(self, dir, sync=False, assetFilter=None):
         # Store references for signal handlers
         plugin = self.plugin
         job_title = self.job.get("title") or self.job.get("id")
 
         # Create custom task
+        description = "Sync" if sync else "Download"
         downloadTask = DownloadJobAssetsTask(
-            f"Download job results: {job_title}", self, dir
+            f"{description} job results: {job_title}",
+            self,
+            dir,
+            sync=sync,
+            optimize=getCompression(),
+            assetFilter=assetFilter,
         )
 
         # Connect signals to slots that can safely interact with GUI
@@ -255,7 +364,9 @@ class OpenEOJobItem(QgsDataItem):
                 return
 
             errors = downloadTask.errors
+            skipped = downloadTask.skipped
             total = downloadTask.total_assets
+            unchanged = f" {skipped} files were unchanged." if sync else ""
 
             if errors == total:
                 if errors > 1:
@@ -264,12 +375,21 @@ class OpenEOJobItem(QgsDataItem):
             else:
                 if errors > 0:
                     plugin.logging.warning(
-                        f"Finished downloading results with {errors} errors to {dir}."
+                        f"Finished downloading results with {errors} errors to {dir}.{unchanged}"
                     )
                 else:
                     plugin.logging.success(
-                        f"Finished downloading all results to {dir}."
+                        f"Finished downloading all results to {dir}.{unchanged}"
                     )
+
+            summary = downloadTask.summary.describe()
+            if summary:
+                plugin.logging.info(summary)
+            if downloadTask.optimizeErrors:
+                plugin.logging.warning(
+                    f"Can't optimize {downloadTask.optimizeErrors} of the downloaded files.",
+                    error=downloadTask.optimizeException,
+                )
             QDesktopServices.openUrl(QUrl.fromLocalFile(str(dir)))
 
         def on_download_error():
@@ -297,17 +417,63 @@ class OpenEOJobItem(QgsDataItem):
             "Add Results to Project",
             parent,
         )
-        action_addGroup.triggered.connect(self.addResultsToProject)
+        action_addGroup.triggered.connect(lambda: self.addResultsToProject())
         actions.append(action_addGroup)
 
+        action_addMosaics = QAction(
+            QgsApplication.getThemeIcon("mActionAddLayer.svg"),
+            "Add Results to Project as Mosaics",
+            parent,
+        )
+        action_addMosaics.triggered.connect(
+            lambda: self.addResultsToProject(mosaic=True)
+        )
+        actions.append(action_addMosaics)
+
         actions_saveResultsTo = QAction(
             QgsApplication.getThemeIcon("downloading_svg.svg"),
             "Download Results to...",
             parent,
         )
-        actions_saveResultsTo.triggered.connect(self.saveResultsTo)
+        actions_saveResultsTo.triggered.connect(lambda: self.saveResultsTo())
         actions.append(actions_saveResultsTo)
 
+        action_selectResults = QAction(
+            QgsApplication.getThemeIcon("downloading_svg.svg"),
+            "Download Selected Results to...",
+            parent,
+        )
+        action_selectResults.triggered.connect(self.selectResultsToSave)
+        actions.append(action_selectResults)
+
+        actions_syncResultsTo = QAction(
+            QgsApplication.getThemeIcon("mActionRefresh.svg"),
+            "Sync Results to...",
+            parent,
+        )
+        actions_syncResultsTo.triggered.connect(self.syncResultsTo)
+        actions.append(actions_syncResultsTo)
+
+        action_downloadExtent = QAction(
+            QgsApplication.getThemeIcon("mActionMapIdentification.svg"),
+            "Download Extent...",
+            parent,
+        )
+        action_downloadExtent.triggered.connect(lambda: self.downloadExtent())
+        actions.append(action_downloadExtent)
+
+        action_optimize = QAction(
+            QgsApplication.getThemeIcon(
+                "algorithms/mAlgorithmCheckGeometry.svg"
+            )
+            if isOptimizeEnabled()
+            else QIcon(),
+            "Optimize downloaded rasters",
+            parent,
+        )
+        action_optimize.triggered.connect(self.toggleOptimize)
+        actions.append(action_optimize)
+
         actions.append(getSeparator(parent))
 
         action_properties = QAction(
@@ -344,6 +510,70 @@ class OpenEOJobItem(QgsDataItem):
 
         return actions
 
+    def downloadExtent(self, assets=None):
+        """Downloads the part of the raster results (or of the given asset
+        items) that lies within the map extent or a polygon layer"""
+        plugin = self.plugin
+        jobName = self.getTitle()
+
+        dialog = ExtentDialog(plugin.iface.mapCanvas())
+        if not dialog.exec():
+            return
+        dir = dialog.getDirectory()
+        area = dialog.getArea()
+        if not dir or area is None:
+            plugin.logging.warning(
+                "Please choose a directory and an area that contains polygons."
+            )
+            return
+
+        clipTask = ClipAssetsTask(
+            f"Download extent of job results: {jobName}",
+            dir,
+            area,
+            resolution=dialog.getResolution(),
+            assets=assets,
+            job_item=self,
+        )
+
+        def on_complete():
+            if not clipTask.total_assets:
+                plugin.logging.warning(
+                    f"Job {jobName} has no raster results that can be clipped."
+                )
+                return
+            size = formatBytes(clipTask.bytes)
+            if clipTask.errors:
+                plugin.logging.warning(
+                    f"Downloaded the extent of {len(clipTask.files)} rasters ({size}) to {dir}, {clipTask.errors} failed.",
+                    error=clipTask.exception,
+                )
+            else:
+                plugin.logging.success(
+                    f"Downloaded the extent of {len(clipTask.files)} rasters ({size}) to {dir}."
+                )
+            QDesktopServices.openUrl(QUrl.fromLocalFile(str(dir)))
+
+        def on_error():
+            if clipTask.canceled:
+                plugin.logging.info(f"Download canceled: {jobName}")
+            else:
+                plugin.logging.error(
+                    f"Can't download the extent of the results of job {jobName}.",
+                    error=clipTask.exception,
+                )
+
+        clipTask.taskCompleted.connect(on_complete)
+        clipTask.taskTerminated.connect(on_error)
+
+        QgsApplication.taskManager().addTask(clipTask)
+        plugin.logging.info(f"Downloading extent: {jobName}")
+
+    def toggleOptimize(self):
+        QgsSettings().setValue(
+            SettingsPath.OPTIMIZE_DOWNLOADS.value, not isOptimizeEnabled()
+        )
+
     def getLink(self, rel):
         if not self.results:
             return None
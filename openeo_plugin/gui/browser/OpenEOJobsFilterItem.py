@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import sys
+
+from qgis.PyQt.QtWidgets import QAction
+
+from qgis.core import Qgis, QgsApplication, QgsDataCollectionItem
+
+from .OpenEOJobItem import OpenEOJobItem
+from .util import getSeparator, getSortAction, resortChildren
+
+
+class OpenEOJobsFilterItem(QgsDataCollectionItem):
+    """
+    QgsDataCollectionItem that shows the batch jobs from the local job index
+    that match a filter. No request to the backend is needed.
+    Direct parent to:
+     - OpenEOJobItem
+    """
+
+    def __init__(self, parent, filter):
+        """Constructor.
+
+        :param parent: the parent DataItem. expected to be OpenEOJobsGroupItem.
+        :type parent: QgsDataItem
+
+        :param filter: the criteria for the batch jobs to show
+        :type filter: JobFilter
+        """
+        QgsDataCollectionItem.__init__(
+            self,
+            parent,
+            self.getFilterName(filter),
+            parent.plugin.PLUGIN_ENTRY_NAME,
+        )
+        self.plugin = parent.plugin
+        self.filter = filter
+        self.sortChildrenBy = "default"
+
+        self.setIcon(QgsApplication.getThemeIcon("mActionFilter2.svg"))
+        # the index is local, so the children can be created on the GUI thread
+        self.setCapabilities(
+            self.capabilities2() | Qgis.BrowserItemCapability.Fast
+        )
+
+    def getFilterName(self, filter):
+        return f"Filter: {filter.describe()}"
+
+    def setFilter(self, filter):
+        self.filter = filter
+        self.setName(self.getFilterName(filter))
+        self.refresh()
+
+    def createChildren(self):
+        try:
+            jobs = self.parent().getJobIndex().query(self.filter)
+        except (sqlite3.Error, OSError) as e:
+            self.plugin.logging.error("Can't search batch jobs.", error=e)
+            return []
+        return [
+            OpenEOJobItem(parent=self, job=job, index=i)
+            for i, job in enumerate(jobs)
+        ]
+
+    def sortKey(self):
+        # show the filters before the batch jobs
+        if self.parent().sortChildrenBy == "title":
+            return ""
+        return -sys.maxsize
+
+    def hasDragEnabled(self):
+        return False
+
+    def getConnection(self):
+        return self.parent().getConnection()
+
+    def getSortAction(self, title, key):
+        return getSortAction(self, title, key, lambda: self.sortBy(key))
+
+    def actions(self, parent):
+        action_refresh = QAction(
+            QgsApplication.getThemeIcon("mActionRefresh.svg"),
+            "Refresh",
+            parent,
+        )
+        action_refresh.triggered.connect(self.refresh)
+
+        action_edit = QAction("Edit filter…", parent)
+        action_edit.triggered.connect(lambda: self.parent().editFilter(self))
+
+        action_remove = QAction("Remove filter", parent)
+        action_remove.triggered.connect(
+            lambda: self.parent().removeFilter(self)
+        )
+
+        return [
+            action_refresh,
+            action_edit,
+            action_remove,
+            getSeparator(parent),
+            self.getSortAction("Sort by: Default", "default"),
+            self.getSortAction("Sort by: Newest first", "newest"),
+            self.getSortAction("Sort by: Oldest first", "oldest"),
+            self.getSortAction("Sort by: Title", "title"),
+        ]
+
+    def sortBy(self, criterion):
+        self.sortChildrenBy = criterion
+        resortChildren(self)
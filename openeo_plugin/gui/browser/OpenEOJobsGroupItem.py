@@ -1,14 +1,44 @@
 # -*- coding: utf-8 -*-
+import sqlite3
+
 import openeo
 
 from qgis.PyQt.QtWidgets import QAction
 from qgis.PyQt.QtCore import pyqtSignal
 
-from qgis.core import QgsDataCollectionItem, QgsApplication
+from qgis.core import (
+    QgsApplication,
+    QgsDataCollectionItem,
+    QgsDataItem,
+    QgsSettings,
+)
 
 from .OpenEOJobItem import OpenEOJobItem
-from .util import getSortAction, getSeparator
+from .OpenEOJobsFilterItem import OpenEOJobsFilterItem
+from .util import (
+    getSortAction,
+    getSeparator,
+    canUpdateChildren,
+    reconcileChildren,
+    resortChildren,
+    setBackgroundLoading,
+    setChildren,
+)
 from .OpenEOPaginationItem import OpenEOPaginationItem
+from .OpenEOLoadingItem import OpenEOLoadingItem
+from ...utils.loadTask import LoadTask, StreamTask
+from ...utils.jobMonitor import JobMonitor
+from ...utils.settings import SettingsPath
+from ..job_filter_dialog import JobFilterDialog
+
+
+def getJobsPageSize():
+    """Returns the number of jobs to request per page or None to use the
+    default of the back-end"""
+    pageSize = QgsSettings().value(
+        SettingsPath.JOBS_PAGE_SIZE.value, 0, type=int
+    )
+    return pageSize if pageSize > 0 else None
 
 
 class OpenEOJobsGroupItem(QgsDataCollectionItem):
@@ -38,41 +68,185 @@ class OpenEOJobsGroupItem(QgsDataCollectionItem):
         self.nextPageDataItem = None
         self.nextLink = None
         self.count = -1
+        self.pages = 0
+        self.loadTask = None
+        self.loadAllTask = None
+        self.filters = []
+        self.nextPageTask = None
+        self.resetNextPage()
+        self.monitor = JobMonitor(self)
 
         self.setIcon(QgsApplication.getThemeIcon("mIconFolder.svg"))
+        setBackgroundLoading(self)
 
         # Connect authentication signal to parent's authenticate method
         self.authenticationRequired.connect(parent.authenticate)
 
     def refresh(self):
-        self.depopulate()
-        super().refresh()
+        self.stopLoading()
+        if not canUpdateChildren(self):
+            self.monitor.stop()
+            self.depopulate()
+            return super().refresh()
+
+        limit = self.getListingLimit()
+
+        def on_loaded(jobs):
+            if self.loadTask is not task:
+                return
+            self.loadTask = None
+            if jobs is None:
+                # not authenticated anymore
+                self.monitor.stop()
+                self.depopulate()
+                super(OpenEOJobsGroupItem, self).refresh()
+                return
+            self.updateJobs(jobs)
+
+        def on_failed(e):
+            if self.loadTask is task:
+                self.loadTask = None
+                self.plugin.logging.error(
+                    "Can't refresh list of batch jobs.", error=e
+                )
+
+        task = LoadTask("Refresh batch jobs", lambda: self.fetchJobs(limit))
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        self.loadTask = task.start()
+
+    def updateJobs(self, jobs):
+        """Updates the children in place from a fresh list of jobs"""
+        self.nextLink = self.getLink(jobs.links, "next")
+        records = [(job["id"], job) for job in jobs]
+        reconcileChildren(
+            self,
+            records,
+            lambda job, index: OpenEOJobItem(
+                parent=self, job=job, index=index
+            ),
+            lambda item, job, index: item.setJob(job, index),
+        )
+        self.count = len(records) - 1
 
-    def createChildren(self):
-        if (
-            not self.isAuthenticated()
-            and not self.parent().loginStarted
-            and not self.parent().forcedLogout
-        ):
-            self.authenticationRequired.emit()
-            return []
+        if self.nextLink is None and self.nextPageDataItem is not None:
+            self.deleteChildItem(self.nextPageDataItem)
+            self.nextPageDataItem = None
+        elif self.nextLink is not None and self.nextPageDataItem is None:
+            self.nextPageDataItem = OpenEOPaginationItem(self)
+            self.addChildItem(self.nextPageDataItem, refresh=True)
 
-        items = []
+        self.monitor.update(self.children())
+        self.prefetchNextPage()
 
-        jobs = self.getJobs()
-        self.nextLink = self.getLink(jobs.links, "next")
+        # the index may have changed
+        for child in self.children():
+            if (
+                isinstance(child, OpenEOJobsFilterItem)
+                and child.state() == QgsDataItem.State.Populated
+            ):
+                child.refresh()
 
-        for job in jobs:
-            self.count += 1
-            item = OpenEOJobItem(parent=self, job=job, index=self.count)
-            items.append(item)
+    def getListingLimit(self):
+        """Returns the limit to request the jobs that are currently loaded"""
+        if self.pages > 1:
+            # as many jobs as have been loaded through pagination
+            return self.count + 1
+        return getJobsPageSize()
 
-        # create item to load more jobs
-        if self.nextLink is not None:
-            self.nextPageDataItem = OpenEOPaginationItem(self)
-            items.append(self.nextPageDataItem)
+    def createChildren(self):
+        self.stopLoading()
+        self.count = -1
+        self.pages = 0
+        # the previous children, incl. the pagination item, have been deleted
+        self.nextPageDataItem = None
 
-        return items
+        def on_loaded(jobs):
+            if self.loadTask is not task:
+                return  # outdated, the group has been refreshed meanwhile
+            self.loadTask = None
+            if jobs is None:
+                setChildren(self, [])
+                if (
+                    not self.parent().loginStarted
+                    and not self.parent().forcedLogout
+                ):
+                    self.authenticationRequired.emit()
+                return
+
+            items = []
+            self.nextLink = self.getLink(jobs.links, "next")
+
+            for job in jobs:
+                self.count += 1
+                item = OpenEOJobItem(parent=self, job=job, index=self.count)
+                items.append(item)
+
+            # create item to load more jobs
+            if self.nextLink is not None:
+                self.nextPageDataItem = OpenEOPaginationItem(self)
+                items.append(self.nextPageDataItem)
+
+            for filter in self.filters:
+                items.append(OpenEOJobsFilterItem(self, filter))
+
+            setChildren(self, items)
+            self.pages = 1
+            self.monitor.update(items)
+            self.prefetchNextPage()
+
+        def on_failed(e):
+            if self.loadTask is task:
+                self.loadTask = None
+                setChildren(self, [])
+                self.plugin.logging.error(
+                    "Can't load list of batch jobs.", error=e
+                )
+
+        task = LoadTask("Load batch jobs", self.loadJobs)
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        self.loadTask = task.start()
+
+        return [OpenEOLoadingItem(self)]
+
+    def loadJobs(self):
+        """Loads the first page of batch jobs or returns None if the user
+        is not authenticated. Runs in a background task."""
+        if not self.isAuthenticated():
+            return None
+        return self.getJobs(getJobsPageSize())
+
+    def fetchJobs(self, limit=None):
+        """Requests the list of batch jobs or returns None if the user is
+        not authenticated. Unlike getJobs() errors are raised, so that a
+        failed refresh doesn't remove the jobs. Runs in a background task."""
+        if not self.isAuthenticated():
+            return None
+        return self.listJobs(limit)
+
+    def listJobs(self, limit=None):
+        """Requests the first page of batch jobs and adds them to the job
+        index. Runs in a background task."""
+        if limit:
+            jobs = self.getConnection().list_jobs(limit=limit)
+        else:
+            jobs = self.getConnection().list_jobs()
+        # the listing is complete if there's no next page
+        complete = self.getLink(jobs.links, "next") is None
+        self.indexJobs(jobs, complete=complete)
+        return jobs
+
+    def getJobIndex(self):
+        return self.parent().getJobIndex()
+
+    def indexJobs(self, jobs, complete=False):
+        """Adds jobs to the local job index. Safe to call from background
+        tasks."""
+        try:
+            self.getJobIndex().update(jobs, complete=complete)
+        except (sqlite3.Error, OSError) as e:
+            self.plugin.logging.debug("Can't update the job index.", error=e)
 
     def getLink(self, links, rel):
         link = next(
@@ -81,27 +255,94 @@ class OpenEOJobsGroupItem(QgsDataCollectionItem):
         )
         return link.href if link else None
 
-    def loadNextItems(self):
+    def fetchPage(self, link):
+        """Requests a page of batch jobs. Runs in a background task."""
         # todo: this should be done via the Python client, but it's not supported yet
         # https://github.com/Open-EO/openeo-python-client/issues/677
         conn = self.getConnection()
-        res = conn.get(
-            self.nextLink,
-            expected_status=200,
-        ).json()
-        newJobs = openeo.rest.models.general.JobListingResponse(
+        res = conn.get(link, expected_status=200).json()
+        jobs = openeo.rest.models.general.JobListingResponse(
             response_data=res, connection=conn
         )
+        self.indexJobs(jobs)
+        return jobs
+
+    def iterPages(self, link):
+        """Yields all pages of batch jobs, starting with the given link.
+        Runs in a background task."""
+        while link is not None:
+            jobs = self.fetchPage(link)
+            yield jobs
+            link = self.getLink(jobs.links, "next")
+
+    def resetNextPage(self):
+        if self.nextPageTask is not None:
+            self.nextPageTask.cancel()
+        self.nextPageTask = None
+        self.nextPageLink = None
+        self.nextPageJobs = None
+        self.nextPageRequested = False
+
+    def prefetchNextPage(self):
+        """Loads the next page in the background, so that it can be shown
+        right away once requested"""
+        link = self.nextLink
+        if link is None or link == self.nextPageLink:
+            return
+        self.resetNextPage()
+        self.nextPageLink = link
+
+        def on_loaded(jobs):
+            if self.nextPageTask is not task:
+                return
+            self.nextPageTask = None
+            self.nextPageJobs = jobs
+            if self.nextPageRequested:
+                self.showNextPage()
+
+        def on_failed(e):
+            if self.nextPageTask is not task:
+                return
+            self.nextPageTask = None
+            requested = self.nextPageRequested
+            # try again when the page is requested
+            self.resetNextPage()
+            if requested:
+                self.plugin.logging.error(
+                    "Can't load more batch jobs.", error=e
+                )
+
+        task = LoadTask("Load batch jobs", lambda: self.fetchPage(link))
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        self.nextPageTask = task.start()
 
-        # JobListingResponse doesn't otherwise join properly
-        self.nextLink = self.getLink(newJobs.links, "next")
+    def loadNextItems(self):
+        if self.nextLink is None or self.loadAllTask is not None:
+            return
+        self.nextPageRequested = True
+        if (
+            self.nextPageJobs is not None
+            and self.nextPageLink == self.nextLink
+        ):
+            self.showNextPage()
+        else:
+            # no-op if the page is being prefetched already
+            self.prefetchNextPage()
 
-        # remove next page button
-        self.deleteChildItem(self.nextPageDataItem)
-        self.nextPageDataItem = None
+    def showNextPage(self):
+        jobs = self.nextPageJobs
+        self.resetNextPage()
+        self.appendPage(jobs)
+        self.prefetchNextPage()
+
+    def appendPage(self, jobs):
+        """Adds the job items of a page after the ones loaded already"""
+        # JobListingResponse doesn't otherwise join properly
+        self.nextLink = self.getLink(jobs.links, "next")
+        self.pages += 1
 
-        # add new job items
-        for job in newJobs:
+        for job in jobs:
             self.count += 1
             item = OpenEOJobItem(
                 parent=self,
@@ -110,10 +351,56 @@ class OpenEOJobsGroupItem(QgsDataCollectionItem):
             )
             self.addChildItem(item, refresh=True)
 
-        # re-add next page button if needed
-        if self.nextLink is not None:
-            self.nextPageDataItem = OpenEOPaginationItem(self)
-            self.addChildItem(self.nextPageDataItem, refresh=True)
+        if self.nextLink is None and self.nextPageDataItem is not None:
+            self.deleteChildItem(self.nextPageDataItem)
+            self.nextPageDataItem = None
+
+        self.monitor.update(self.children())
+
+    def loadAllItems(self):
+        """Loads all remaining pages in the background and adds their items
+        page by page"""
+        if self.nextLink is None or self.loadAllTask is not None:
+            return
+        jobs = None
+        if self.nextPageLink == self.nextLink:
+            jobs = self.nextPageJobs
+        self.resetNextPage()
+        if jobs is not None:
+            # the next page has been prefetched already
+            self.appendPage(jobs)
+        link = self.nextLink
+        if link is None:
+            return
+
+        def on_page(jobs):
+            if self.loadAllTask is task:
+                self.appendPage(jobs)
+
+        def on_completed(complete):
+            if self.loadAllTask is task:
+                self.loadAllTask = None
+                self.prefetchNextPage()
+
+        def on_failed(e):
+            if self.loadAllTask is task:
+                self.loadAllTask = None
+                self.plugin.logging.error(
+                    "Can't load all batch jobs.", error=e
+                )
+
+        task = StreamTask("Load all batch jobs", lambda: self.iterPages(link))
+        task.chunkLoaded.connect(on_page)
+        task.completed.connect(on_completed)
+        task.failed.connect(on_failed)
+        self.loadAllTask = task.start()
+
+    def stopLoading(self):
+        """Cancels loading further pages"""
+        if self.loadAllTask is not None:
+            self.loadAllTask.cancel()
+            self.loadAllTask = None
+        self.resetNextPage()
 
     def getConnection(self):
         return self.parent().getConnection()
@@ -122,15 +409,21 @@ class OpenEOJobsGroupItem(QgsDataCollectionItem):
         return self.parent().isAuthenticated()
 
     def handleDoubleClick(self):
-        if not self.parent().loginStarted and not self.isAuthenticated():
-            self.parent().authenticate()
+        connection = self.parent()
+        if (
+            not connection.loginStarted
+            and not self.isAuthenticated()
+            and not connection.isRestoringLogin()
+        ):
+            # the stored login is restored in the background otherwise
+            connection.authenticate()
         else:
             return super().handleDoubleClick()
         return True
 
-    def getJobs(self):
+    def getJobs(self, limit=None):
         try:
-            return self.getConnection().list_jobs()
+            return self.listJobs(limit)
 
         except openeo.rest.OpenEoApiError:
             # when authentication is missing
@@ -155,6 +448,23 @@ class OpenEOJobsGroupItem(QgsDataCollectionItem):
         action_refresh.triggered.connect(self.refresh)
         actions.append(action_refresh)
 
+        if self.loadAllTask is not None:
+            action_stop = QAction("Stop loading batch jobs", parent)
+            action_stop.triggered.connect(self.stopLoading)
+            actions.append(action_stop)
+        elif self.nextLink is not None:
+            action_all = QAction("Load all batch jobs", parent)
+            action_all.triggered.connect(self.loadAllItems)
+            actions.append(action_all)
+
+        action_filter = QAction(
+            QgsApplication.getThemeIcon("mActionFilter2.svg"),
+            "Filter batch jobs…",
+            parent,
+        )
+        action_filter.triggered.connect(self.addFilter)
+        actions.append(action_filter)
+
         actions.extend(
             [
                 getSeparator(parent),
@@ -169,4 +479,27 @@ class OpenEOJobsGroupItem(QgsDataCollectionItem):
 
     def sortBy(self, criterion):
         self.sortChildrenBy = criterion
-        self.refresh()
+        resortChildren(self)
+
+    def addFilter(self):
+        dialog = JobFilterDialog()
+        if not dialog.exec():
+            return
+        filter = dialog.getFilter()
+        self.filters.append(filter)
+        if canUpdateChildren(self):
+            self.addChildItem(OpenEOJobsFilterItem(self, filter), refresh=True)
+        else:
+            self.populate()
+
+    def editFilter(self, item):
+        dialog = JobFilterDialog(item.filter)
+        if not dialog.exec():
+            return
+        filter = dialog.getFilter()
+        self.filters[self.filters.index(item.filter)] = filter
+        item.setFilter(filter)
+
+    def removeFilter(self, item):
+        self.filters.remove(item.filter)
+        self.deleteChildItem(item)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from qgis.core import QgsDataItem
+from qgis.core import Qgis
+
+
+class OpenEOLoadingItem(QgsDataItem):
+    """
+    QgsDataItem that is shown as placeholder while the children of its
+    parent are loaded in the background.
+    """
+
+    def __init__(self, parent):
+        """Constructor.
+
+        :param parent: the parent DataItem that is loading its children.
+        :type parent: QgsDataItem
+        """
+        QgsDataItem.__init__(
+            self,
+            type=Qgis.BrowserItemType.Custom,
+            parent=parent,
+            name="Loading…",
+            path=None,
+            providerKey=parent.plugin.PLUGIN_ENTRY_NAME,
+        )
+        self.plugin = parent.plugin
+        self.setState(QgsDataItem.State.Populated)
+
+    def sortKey(self):
+        return ""
+
+    def hasDragEnabled(self):
+        return False
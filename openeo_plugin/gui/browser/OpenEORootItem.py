@@ -7,8 +7,6 @@ from qgis.PyQt.QtWidgets import QAction
 from qgis.core import QgsSettings, QgsDataCollectionItem, QgsApplication
 
 from .util import getSeparator
-from .OpenEOConnectionItem import OpenEOConnectionItem
-from ..connect_dialog import ConnectDialog
 from ...utils.settings import SettingsPath
 from ...models.ConnectionModel import ConnectionModel
 
@@ -55,9 +53,16 @@ class OpenEORootItem(QgsDataCollectionItem):
         for model in self.saved_connections:
             item = self.createConnectionItem(model)
             items.append(item)
+        # restore the stored logins of all connections in parallel
+        for item in items:
+            item.restoreLogin()
         return items
 
     def createConnectionItem(self, model, connection=None):
+        # imported when a connection is created, as it pulls in the openEO
+        # client and the rest of the browser tree
+        from .OpenEOConnectionItem import OpenEOConnectionItem
+
         return OpenEOConnectionItem(
             model=model, parent=self, connection=connection
         )
@@ -67,6 +72,8 @@ class OpenEORootItem(QgsDataCollectionItem):
         return os.path.join(dirname, name)
 
     def addConnection(self):
+        from ..connect_dialog import ConnectDialog
+
         settings = QgsSettings()
         self.dlg = ConnectDialog(self.plugin)
         self.dlg.show()
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 from collections.abc import Iterable
-import dateutil.parser
 
 from qgis.PyQt.QtCore import Qt
 from qgis.PyQt.QtWidgets import QApplication, QAction
@@ -13,8 +12,7 @@ from qgis.core import (
     QgsApplication,
 )
 
-from .util import getSeparator
-from ...utils.wmts import WebMapTileService
+from .util import createSortKeys, getSeparator, getSortKey
 
 
 class OpenEOServiceItem(QgsDataItem):
@@ -56,6 +54,18 @@ class OpenEOServiceItem(QgsDataItem):
 
         self.updateFromData()
 
+    def getId(self):
+        return self.serviceID
+
+    def setService(self, service, index):
+        """Updates the item with the service metadata from a fresh listing"""
+        if service != self.service:
+            self.service = service
+            self.uris = []
+        self.index = index
+        self.updateFromData()
+        self.dataChanged.emit(self)
+
     def refresh(self, children: Iterable[QgsDataItem] | bool = False):
         if children is False:
             self.getService()
@@ -69,22 +79,12 @@ class OpenEOServiceItem(QgsDataItem):
         if not self.isEnabled():
             status = "(disabled) "
         self.setName(status + name)
+        self.sortKeys = createSortKeys(
+            self.service, self.getTitle(), self.index
+        )
 
     def sortKey(self):
-        sortBy = self.parent().sortChildrenBy
-        if sortBy == "title":
-            return self.getTitle().lower()
-        elif sortBy == "oldest" or sortBy == "newest":
-            try:
-                created = self.service.get("created", "")
-                timestamp = dateutil.parser.isoparse(created).timestamp()
-                if sortBy == "newest":
-                    timestamp *= -1
-                return int(timestamp)
-            except Exception:
-                return 0
-        else:  # default, keep initial backend order
-            return self.index
+        return getSortKey(self.sortKeys, self.parent().sortChildrenBy)
 
     def hasDragEnabled(self):
         return True
@@ -121,7 +121,7 @@ class OpenEOServiceItem(QgsDataItem):
             return uri
         elif mapType.lower() == "wmts":
             wmtsUrl = link["url"] + "?service=wmts&request=getCapabilities"
-            wmts = WebMapTileService(wmtsUrl)
+            wmts = self.plugin.getWmtsCache().getSummary(wmtsUrl)
             targetCRS = "EPSG::3857"
 
             tileMatrixSet = None
@@ -7,8 +7,18 @@ from qgis.PyQt.QtCore import pyqtSignal
 from qgis.core import QgsDataCollectionItem
 from qgis.core import QgsApplication
 
-from .util import getSortAction, getSeparator
+from .util import (
+    getSortAction,
+    getSeparator,
+    canUpdateChildren,
+    reconcileChildren,
+    resortChildren,
+    setBackgroundLoading,
+    setChildren,
+)
 from .OpenEOServiceItem import OpenEOServiceItem
+from .OpenEOLoadingItem import OpenEOLoadingItem
+from ...utils.loadTask import LoadTask
 
 
 class OpenEOServicesGroupItem(QgsDataCollectionItem):
@@ -35,32 +45,104 @@ class OpenEOServicesGroupItem(QgsDataCollectionItem):
         )
         self.plugin = parent.plugin
         self.sortChildrenBy = "default"
+        self.loadTask = None
 
         self.setIcon(QgsApplication.getThemeIcon("mIconFolder.svg"))
+        setBackgroundLoading(self)
 
         # Connect authentication signal to parent's authenticate method
         self.authenticationRequired.connect(parent.authenticate)
 
     def refresh(self):
-        self.depopulate()
-        super().refresh()
+        if not canUpdateChildren(self):
+            self.depopulate()
+            return super().refresh()
+
+        def on_loaded(services):
+            if self.loadTask is not task:
+                return
+            self.loadTask = None
+            if services is None:
+                # not authenticated anymore
+                self.depopulate()
+                super(OpenEOServicesGroupItem, self).refresh()
+                return
+            self.updateServices(services)
+
+        def on_failed(e):
+            if self.loadTask is task:
+                self.loadTask = None
+                self.plugin.logging.error(
+                    "Can't refresh list of services.", error=e
+                )
+
+        task = LoadTask("Refresh web services", self.fetchServices)
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        self.loadTask = task.start()
+
+    def updateServices(self, services):
+        """Updates the children in place from a fresh list of services"""
+        reconcileChildren(
+            self,
+            [(service["id"], service) for service in services],
+            lambda service, index: OpenEOServiceItem(
+                parent=self, service=service, index=index
+            ),
+            lambda item, service, index: item.setService(service, index),
+        )
 
-    def createChildren(self):
-        if (
-            not self.isAuthenticated()
-            and not self.parent().loginStarted
-            and not self.parent().forcedLogout
-        ):
-            self.authenticationRequired.emit()
-            return []
+    def fetchServices(self):
+        """Requests the list of services or returns None if the user is
+        not authenticated. Unlike getServices() errors are raised, so that
+        a failed refresh doesn't remove the services. Runs in a background
+        task."""
+        if not self.isAuthenticated():
+            return None
+        return self.getConnection().list_services()
 
-        items = []
-        services = self.getServices()
-        for i, service in enumerate(services):
-            items.append(
-                OpenEOServiceItem(parent=self, service=service, index=i)
-            )
-        return items
+    def createChildren(self):
+        def on_loaded(services):
+            if self.loadTask is not task:
+                return  # outdated, the group has been refreshed meanwhile
+            self.loadTask = None
+            if services is None:
+                setChildren(self, [])
+                if (
+                    not self.parent().loginStarted
+                    and not self.parent().forcedLogout
+                ):
+                    self.authenticationRequired.emit()
+                return
+
+            items = []
+            for i, service in enumerate(services):
+                items.append(
+                    OpenEOServiceItem(parent=self, service=service, index=i)
+                )
+            setChildren(self, items)
+
+        def on_failed(e):
+            if self.loadTask is task:
+                self.loadTask = None
+                setChildren(self, [])
+                self.plugin.logging.error(
+                    "Can't load list of services.", error=e
+                )
+
+        task = LoadTask("Load web services", self.loadServices)
+        task.loaded.connect(on_loaded)
+        task.failed.connect(on_failed)
+        self.loadTask = task.start()
+
+        return [OpenEOLoadingItem(self)]
+
+    def loadServices(self):
+        """Loads the list of services or returns None if the user is not
+        authenticated. Runs in a background task."""
+        if not self.isAuthenticated():
+            return None
+        return self.getServices()
 
     def getConnection(self):
         return self.parent().getConnection()
@@ -69,8 +151,14 @@ class OpenEOServicesGroupItem(QgsDataCollectionItem):
         return self.parent().isAuthenticated()
 
     def handleDoubleClick(self):
-        if not self.parent().loginStarted and not self.isAuthenticated():
-            self.parent().authenticate()
+        connection = self.parent()
+        if (
+            not connection.loginStarted
+            and not self.isAuthenticated()
+            and not connection.isRestoringLogin()
+        ):
+            # the stored login is restored in the background otherwise
+            connection.authenticate()
         else:
             return super().handleDoubleClick()
         return True
@@ -113,4 +201,4 @@ class OpenEOServicesGroupItem(QgsDataCollectionItem):
 
     def sortBy(self, criterion):
         self.sortChildrenBy = criterion
-        self.refresh()
+        resortChildren(self)
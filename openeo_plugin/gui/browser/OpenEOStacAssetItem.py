@@ -1,4 +1,5 @@
-import requests
+import json
+import re
 from pathlib import Path
 from urllib.parse import urlparse, urljoin
 
@@ -18,7 +19,27 @@ from qgis.core import QgsApplication
 from .util import getSeparator
 from ...utils.filetypes import MEDIATYPES, EXTENSIONS
 from ..directory_dialog import DirectoryDialog
-from ...utils.downloadTask import DownloadAssetTask
+from ...utils.downloadTask import (
+    DownloadAssetTask,
+    DownloadCanceled,
+    getFreePath,
+)
+from ...utils.checksum import createHash, hashFile, verifyChecksum
+from ...utils.sessionPool import getSession
+from ...utils.remoteAccess import applyRemoteAccessOptions
+from ...utils.mosaic import MOSAIC_FORMATS
+from ...utils.optimize import getCompression
+
+
+def getContentLength(response):
+    """Returns the size of the file from the Content-Length header or None.
+    Compressed responses are ignored, as the header then has the size of
+    the compressed data."""
+    size = response.headers.get("Content-Length")
+    encoding = response.headers.get("Content-Encoding", "identity")
+    if not size or encoding.lower() != "identity":
+        return None
+    return int(size)
 
 
 class OpenEOStacAssetItem(QgsDataItem):
@@ -108,6 +129,7 @@ class OpenEOStacAssetItem(QgsDataItem):
                 url = f"/vsicurl/{url}"
             elif scheme == "s3":
                 url = f"/vsis3/{url[5:]}"  # remove 's3://'
+            url = applyRemoteAccessOptions(url, self.plugin.logging)
 
         if self.fileType.get("vsi"):
             url = f"{self.fileType['vsi']}{url}"
@@ -117,6 +139,28 @@ class OpenEOStacAssetItem(QgsDataItem):
         self.uris = [uri]
         return self.uris
 
+    def getRasterSource(self):
+        """Returns the GDAL path of the asset if it can be part of a mosaic"""
+        if not self.fileType or self.layerType is None:
+            return None
+        if self.fileType.get("format") not in MOSAIC_FORMATS:
+            return None
+        uri = self.mimeUris()[0]
+        return uri.uri if uri else None
+
+    def canClip(self):
+        return (
+            self.fileType is not None
+            and self.fileType.get("format") in MOSAIC_FORMATS
+            and not self.fileType.get("download", False)
+        )
+
+    def downloadExtent(self):
+        self.parent().downloadExtent(assets=[self])
+
+    def getTimeStep(self):
+        return self.asset.get("datetime") or self.asset.get("start_datetime")
+
     def hasDragEnabled(self):
         return self.producesValidLayer()
 
@@ -206,7 +250,18 @@ class OpenEOStacAssetItem(QgsDataItem):
         path = self.downloadFolder()
         self.queueDownloadTask(path)
 
-    def downloadAsset(self, dir=None):
+    def downloadAsset(
+        self, dir=None, onProgress=None, isCanceled=None, reservePath=None
+    ):
+        """Download the asset into the given directory.
+
+        :param onProgress: Optional callback that receives the number of
+            bytes received so far and the total size (or None if unknown).
+        :param isCanceled: Optional callback that returns True if the
+            download should be stopped.
+        :param reservePath: Optional callback that returns a free path for
+            the given one, for downloads that run in parallel.
+        """
         href = self.resolveUrl()
 
         if not href:
@@ -215,33 +270,266 @@ class OpenEOStacAssetItem(QgsDataItem):
             )
 
         dir = Path(dir) if dir else self.downloadFolder()
+        path = self.targetPath(dir, href)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # check if file exists and append a number if it does.
+        if reservePath is not None:
+            path = reservePath(path)
+        else:
+            path = getFreePath(path)
+
+        self.downloadToFile(href, path, onProgress, isCanceled)
+        return path
 
+    def targetPath(self, dir, href=None):
         local = self.asset.get("file:local_path")
         if local:
-            path = dir / local
-        else:
-            remote_path = Path(urlparse(href).path)
-            path = dir / remote_path.name
+            return dir / local
+        remote_path = Path(urlparse(href or self.resolveUrl()).path)
+        return dir / remote_path.name
+
+    def syncAsset(
+        self, dir, manifest, onProgress=None, isCanceled=None, path=None
+    ):
+        """Download the asset into the given directory unless the local file
+        is up to date already. Other than downloadAsset, existing files are
+        replaced instead of saving the asset under a new name.
+
+        :param manifest: The SyncManifest of the directory.
+        :param path: The path of the file, targetPath() by default.
+        :returns: The path of the file and whether it was downloaded.
+        """
+        href = self.resolveUrl()
+        if not href:
+            raise ValueError(
+                "Asset is missing 'href' and cannot be downloaded."
+            )
 
+        dir = Path(dir)
+        if path is None:
+            path = self.targetPath(dir, href)
         path.parent.mkdir(parents=True, exist_ok=True)
 
-        # check if file exists and append a number if it does
-        filename = path.stem
-        i = 2
-        while path.exists():
-            path = path.with_stem(f"{filename}_({i})")
-            i += 1
+        remote = {
+            "key": self.key,
+            "size": self.asset.get("file:size"),
+            "checksum": self.asset.get("file:checksum"),
+        }
+
+        if path.exists():
+            entry = manifest.get(path)
+            if entry and manifest.isLocalUnchanged(path, entry):
+                unchanged = self.isRemoteUnchanged(href, entry, remote)
+            else:
+                unchanged = self.isLocalUpToDate(href, path, remote)
+            if isinstance(unchanged, dict):
+                manifest.set(path, dict(entry or {}, **unchanged))
+            if unchanged is not False:
+                return path, False
+
+        info = self.downloadToFile(href, path, onProgress, isCanceled)
+        remote["etag"] = info.get("etag")
+        remote["last_modified"] = info.get("last_modified")
+        # the local file may change in size once it is optimized
+        remote["size"] = remote["size"] or info.get("size")
+        manifest.set(path, remote)
+        return path, True
+
+    def isRemoteUnchanged(self, href, entry, remote):
+        """Compare the asset with the state recorded in the sync manifest.
+
+        Uses the STAC metadata if possible and falls back to a HEAD request.
+        Returns False if the asset has changed, True if it is unchanged and
+        a dict with updated manifest fields if the server had to be asked.
+        """
+        if remote["checksum"] or remote["size"]:
+            return (
+                remote["checksum"] == entry.get("checksum")
+                and (not remote["size"] or remote["size"] == entry.get("size"))
+                and remote["key"] == entry.get("key")
+            )
 
-        # stream data to file
-        with requests.get(href, stream=True, timeout=20) as r:
+        head = self.headAsset(href)
+        # older manifests only have the size of the local file
+        size = entry.get("size") or entry.get("local_size")
+        if head["etag"] and entry.get("etag"):
+            unchanged = head["etag"] == entry["etag"]
+        elif head["last_modified"] and entry.get("last_modified"):
+            unchanged = head["last_modified"] == entry["last_modified"]
+        else:
+            unchanged = head["size"] is not None and head["size"] == size
+        if not unchanged:
+            return False
+        updated = dict(remote, **head)
+        updated["size"] = head["size"] or size
+        return updated
+
+    def isLocalUpToDate(self, href, path, remote):
+        """Compare an existing file, unknown to the sync manifest, with the
+        asset. Returns the manifest entry for the file if it matches."""
+        checksum = remote["checksum"]
+        if checksum:
+            try:
+                matches = verifyChecksum(path, checksum)
+                if matches is not None:
+                    return remote if matches else False
+            except ValueError:
+                pass
+
+        head = {}
+        size = remote["size"]
+        if not size:
+            head = self.headAsset(href)
+            size = head["size"]
+        if size and size == path.stat().st_size:
+            return dict(remote, **head)
+        return False
+
+    def headAsset(self, href):
+        session = getSession(href)
+        with session.head(
+            href,
+            timeout=20,
+            allow_redirects=True,
+            headers={"Accept-Encoding": "identity"},
+        ) as r:
             r.raise_for_status()
-            with open(path, "wb") as f:
-                for chunk in r.iter_content(
-                    chunk_size=10 * 1024 * 1024
-                ):  # 10 MB chunk size
-                    f.write(chunk)
+            size = getContentLength(r)
+            return {
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+                "size": int(size) if size else None,
+            }
 
-        return path
+    def downloadToFile(self, href, path, onProgress=None, isCanceled=None):
+        """Download the asset into a ".part" file and move it to the given
+        path once it is complete and verified.
+
+        If a previous download of the file has been interrupted, it is
+        resumed with an HTTP Range request if the server supports it.
+
+        :returns: A dict with the ETag, Last-Modified and size of the file.
+        """
+        part = path.with_name(f"{path.name}.part")
+        partInfo = path.with_name(f"{path.name}.part.json")
+
+        checksum = self.asset.get("file:checksum")
+        hash, digest = None, None
+        if checksum:
+            try:
+                hash, digest = createHash(checksum)
+            except ValueError as e:
+                self.plugin.logging.debug(
+                    f"Can't verify the checksum of asset {self.name()}.",
+                    error=e,
+                )
+
+        offset = 0
+        # the sizes and ranges refer to the file itself, not to a compressed
+        # transfer of it
+        headers = {"Accept-Encoding": "identity"}
+        if part.exists() and partInfo.exists():
+            try:
+                info = json.loads(partInfo.read_text())
+            except ValueError:
+                info = {}
+            validator = info.get("etag") or info.get("last_modified")
+            if info.get("href") == href and validator:
+                offset = part.stat().st_size
+            else:
+                # the file may belong to another asset with the same name,
+                # or it may have changed, which can't be told without a
+                # validator, so start over
+                part.unlink(missing_ok=True)
+                partInfo.unlink(missing_ok=True)
+            if offset > 0:
+                headers["Range"] = f"bytes={offset}-"
+                # server sends the full file if it has changed meanwhile
+                headers["If-Range"] = validator
+
+        session = getSession(href)
+        with session.get(href, stream=True, timeout=20, headers=headers) as r:
+            total = self.asset.get("file:size")
+            mode = "wb"
+            if r.status_code == 416 and offset > 0:
+                # requested range is not satisfiable: either the file is
+                # complete already or it has changed, so start over.
+                contentRange = r.headers.get("Content-Range", "")
+                if contentRange != f"bytes */{offset}":
+                    part.unlink(missing_ok=True)
+                    partInfo.unlink(missing_ok=True)
+                    r.close()
+                    return self.downloadToFile(
+                        href, path, onProgress, isCanceled
+                    )
+                total = total or offset
+                mode = None
+            elif r.status_code == 206:
+                contentRange = r.headers.get("Content-Range", "")
+                match = re.match(r"bytes (\d+)-\d+/(\d+|\*)", contentRange)
+                if not match or int(match.group(1)) != offset:
+                    raise ValueError(
+                        f"Server sent an unexpected range: {contentRange}"
+                    )
+                if not total and match.group(2) != "*":
+                    total = int(match.group(2))
+                mode = "ab"
+            else:
+                r.raise_for_status()
+                offset = 0
+                if not total:
+                    total = getContentLength(r)
+
+            if hash is not None and offset > 0:
+                hashFile(hash, part)
+
+            if mode is not None:
+                partInfo.write_text(
+                    json.dumps(
+                        {
+                            "href": href,
+                            "etag": r.headers.get("ETag"),
+                            "last_modified": r.headers.get("Last-Modified"),
+                            "size": total,
+                        }
+                    )
+                )
+
+                received = offset
+                with open(part, mode) as f:
+                    for chunk in r.iter_content(
+                        chunk_size=1024 * 1024
+                    ):  # 1 MB chunk size, allows to cancel quickly
+                        if isCanceled and isCanceled():
+                            # keep the partial file to resume later
+                            raise DownloadCanceled()
+                        f.write(chunk)
+                        if hash is not None:
+                            hash.update(chunk)
+                        received += len(chunk)
+                        if onProgress:
+                            onProgress(received, total)
+
+        size = part.stat().st_size
+        if total and size != total:
+            if size > total:
+                part.unlink(missing_ok=True)
+                partInfo.unlink(missing_ok=True)
+            raise ValueError(
+                f"Download is incomplete, received {size} of {total} bytes."
+            )
+
+        if hash is not None and hash.digest() != digest:
+            part.unlink(missing_ok=True)
+            partInfo.unlink(missing_ok=True)
+            raise ValueError("Downloaded file doesn't match its checksum.")
+
+        info = json.loads(partInfo.read_text())
+        info["size"] = size
+        part.replace(path)
+        partInfo.unlink(missing_ok=True)
+        return info
 
     def downloadFolder(self):
         return Path.home() / "Downloads"
@@ -267,7 +555,10 @@ class OpenEOStacAssetItem(QgsDataItem):
 
         # Create custom task with signals
         downloadTask = DownloadAssetTask(
-            f"Download Asset: {assetName}", self.downloadAsset, dir
+            f"Download Asset: {assetName}",
+            self.downloadAsset,
+            dir,
+            optimize=getCompression(),
         )
 
         # Connect signals to slots that can safely interact with GUI
@@ -275,10 +566,21 @@ class OpenEOStacAssetItem(QgsDataItem):
             plugin.logging.success(
                 f"Finished downloading asset {assetName} to {dir}."
             )
+            summary = downloadTask.summary.describe()
+            if summary:
+                plugin.logging.info(summary)
+            if downloadTask.optimizeException is not None:
+                plugin.logging.warning(
+                    f"Can't optimize the asset {assetName}.",
+                    error=downloadTask.optimizeException,
+                )
             if openDestination:
                 QDesktopServices.openUrl(QUrl.fromLocalFile(str(dir)))
 
         def on_download_error():
+            if downloadTask.isCanceled():
+                plugin.logging.info(f"Download canceled: {assetName}")
+                return
             plugin.logging.error(
                 f"Can't download the asset {assetName} to {dir}.",
                 error=downloadTask.exception,
@@ -323,6 +625,15 @@ class OpenEOStacAssetItem(QgsDataItem):
         action_downloadTo.triggered.connect(self.downloadTo)
         actions.append(action_downloadTo)
 
+        if self.canClip():
+            action_downloadExtent = QAction(
+                QgsApplication.getThemeIcon("mActionMapIdentification.svg"),
+                "Download Extent...",
+                parent,
+            )
+            action_downloadExtent.triggered.connect(self.downloadExtent)
+            actions.append(action_downloadExtent)
+
         actions.append(getSeparator(parent))
 
         action_copy_url = QAction(
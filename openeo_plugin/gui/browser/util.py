@@ -1,7 +1,7 @@
 from qgis.PyQt.QtWidgets import QAction
 from qgis.PyQt.QtGui import QIcon
 
-from qgis.core import QgsApplication
+from qgis.core import Qgis, QgsApplication, QgsDataItem
 
 
 def getSortAction(item, title, key, callback):
@@ -16,7 +16,92 @@ def getSortAction(item, title, key, callback):
     return action
 
 
+def createSortKeys(data, title, index):
+    """Precomputes the keys to sort a job or service by, see getSortKey()"""
+    import dateutil.parser
+
+    try:
+        created = dateutil.parser.isoparse(data.get("created", ""))
+        timestamp = int(created.timestamp())
+    except Exception:
+        timestamp = None
+    return {"title": title.lower(), "created": timestamp, "index": index}
+
+
+def getSortKey(sortKeys, sortBy):
+    if sortBy == "title":
+        return sortKeys["title"]
+    elif sortBy == "oldest" or sortBy == "newest":
+        timestamp = sortKeys["created"]
+        if timestamp is None:
+            return 0
+        return -timestamp if sortBy == "newest" else timestamp
+    else:  # default, keep initial backend order
+        return sortKeys["index"]
+
+
+def resortChildren(item):
+    """Lets the browser sort the children of an item again by their
+    current sortKey(), without reloading them"""
+    for child in item.children():
+        child.dataChanged.emit(child)
+
+
 def getSeparator(parent):
     separator = QAction(parent)
     separator.setSeparator(True)
     return separator
+
+
+def setBackgroundLoading(item):
+    """Marks a data item as fast to populate. The item's createChildren()
+    only returns a placeholder and loads the actual children in the
+    background, so it can run on the GUI thread."""
+    item.setCapabilities(
+        item.capabilities2() | Qgis.BrowserItemCapability.Fast
+    )
+
+
+def canUpdateChildren(item):
+    """Checks whether the children of a group have been loaded, so that a
+    refresh can update them in place (see reconcileChildren())"""
+    return (
+        item.state() == QgsDataItem.State.Populated and item.loadTask is None
+    )
+
+
+def reconcileChildren(item, records, createChild, updateChild):
+    """Matches a fresh listing against the children of a data item by id.
+
+    Existing children are updated in place, new ones are added and the
+    ones that have vanished are removed. Children without an id (e.g. the
+    pagination item) are kept. This preserves the expansion state and
+    anything that the children have loaded already.
+
+    :param records: list of (id, data) tuples in the order of the listing
+    :param createChild: function(data, index) that returns a new child
+    :param updateChild: function(child, data, index)
+    """
+    children = {}
+    for child in item.children():
+        if hasattr(child, "getId"):
+            children[child.getId()] = child
+
+    for index, (id, data) in enumerate(records):
+        child = children.pop(id, None)
+        if child is None:
+            item.addChildItem(createChild(data, index), refresh=True)
+        else:
+            updateChild(child, data, index)
+
+    for child in children.values():
+        item.deleteChildItem(child)
+
+
+def setChildren(item, children):
+    """Replaces the children of a data item, e.g. the placeholder once the
+    children have been loaded in the background."""
+    for child in list(item.children()):
+        item.deleteChildItem(child)
+    for child in children:
+        item.addChildItem(child, refresh=True)
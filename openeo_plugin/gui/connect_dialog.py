@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 import os
-import requests
 
 from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets
@@ -8,6 +7,7 @@ from qgis.PyQt.QtWidgets import QApplication
 
 # from .ui.connect_dialog import Ui_ConnectDialog as FORM_CLASS
 from ..models.ConnectionModel import ConnectionModel
+from ..utils.sessionPool import getSession
 
 # This loads your .ui file so that PyQt can populate your plugin with the elements from Qt Designer
 # use this if the pb_tool compiled version of the dialog doesn't work
@@ -116,12 +116,11 @@ class ConnectDialog(QtWidgets.QDialog, FORM_CLASS):
         return
 
     def getHubBackends(self):
+        url = "{}/api/backends".format(self.HUB_URL)
         try:
-            backendUrl = requests.get(
-                "{}/api/backends".format(self.HUB_URL), timeout=5
-            )
+            backendUrl = getSession(url).get(url, timeout=5)
         except Exception:
-            hubBackends = {}
+            return []
 
         if backendUrl.status_code == 200:
             hubBackends = backendUrl.json()
@@ -0,0 +1,120 @@
+import json
+import tempfile
+from pathlib import Path
+
+from qgis.PyQt import QtWidgets
+
+from qgis.core import Qgis, QgsGeometry
+from qgis.gui import QgsFileWidget, QgsMapLayerComboBox
+
+from ..utils.clipTask import ClipArea
+
+
+class ExtentDialog(QtWidgets.QDialog):
+    """
+    Dialog to choose the area, the resolution and the directory for
+    downloading the part of raster results within an extent.
+    """
+
+    def __init__(self, canvas, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Download Extent")
+        self.canvas = canvas
+
+        self.canvasButton = QtWidgets.QRadioButton("Current map extent")
+        self.canvasButton.setChecked(True)
+        self.layerButton = QtWidgets.QRadioButton("Polygon layer")
+
+        self.layerBox = QgsMapLayerComboBox()
+        self.layerBox.setFilters(Qgis.LayerFilter.PolygonLayer)
+        self.selectedCheck = QtWidgets.QCheckBox("Selected features only")
+        hasLayers = self.layerBox.count() > 0
+        self.layerButton.setEnabled(hasLayers)
+        self.layerButton.toggled.connect(self.layerBox.setEnabled)
+        self.layerButton.toggled.connect(self.selectedCheck.setEnabled)
+        self.layerBox.setEnabled(False)
+        self.selectedCheck.setEnabled(False)
+
+        self.resolutionEdit = QtWidgets.QDoubleSpinBox()
+        self.resolutionEdit.setDecimals(6)
+        self.resolutionEdit.setMaximum(1e7)
+        self.resolutionEdit.setSpecialValueText("Full resolution")
+        self.resolutionEdit.setToolTip(
+            "Pixel size in the units of the raster's CRS. Coarser "
+            "resolutions are read from the overviews of the raster."
+        )
+
+        self.dirWidget = QgsFileWidget()
+        self.dirWidget.setStorageMode(QgsFileWidget.StorageMode.GetDirectory)
+        self.dirWidget.setFilePath(str(Path.home() / "Downloads"))
+
+        form = QtWidgets.QFormLayout()
+        form.addRow(self.canvasButton)
+        form.addRow(self.layerButton, self.layerBox)
+        form.addRow("", self.selectedCheck)
+        form.addRow("Resolution", self.resolutionEdit)
+        form.addRow("Download to", self.dirWidget)
+
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.StandardButton.Ok
+            | QtWidgets.QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+
+    def getDirectory(self):
+        return self.dirWidget.filePath() or None
+
+    def getResolution(self):
+        return self.resolutionEdit.value() or None
+
+    def getArea(self):
+        """Returns the ClipArea or None if the layer has no polygons"""
+        if not self.layerButton.isChecked():
+            extent = self.canvas.extent()
+            crs = self.canvas.mapSettings().destinationCrs()
+            return ClipArea(
+                bounds=(
+                    extent.xMinimum(),
+                    extent.yMinimum(),
+                    extent.xMaximum(),
+                    extent.yMaximum(),
+                ),
+                crs=crs.authid() or crs.toWkt(),
+            )
+
+        layer = self.layerBox.currentLayer()
+        if layer is None:
+            return None
+        if self.selectedCheck.isChecked():
+            features = layer.selectedFeatures()
+        else:
+            features = layer.getFeatures()
+        geometries = [f.geometry() for f in features if f.hasGeometry()]
+        if not geometries:
+            return None
+        geometry = QgsGeometry.unaryUnion(geometries)
+
+        # GDAL reads the cutline from a file
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".geojson", delete=False
+        ) as f:
+            json.dump(
+                {
+                    "type": "FeatureCollection",
+                    "features": [
+                        {
+                            "type": "Feature",
+                            "properties": {},
+                            "geometry": json.loads(geometry.asJson()),
+                        }
+                    ],
+                },
+                f,
+            )
+        crs = layer.crs()
+        return ClipArea(crs=crs.authid() or crs.toWkt(), cutline=f.name)
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import QDate
+
+from ..utils.jobIndex import JobFilter
+
+STATUSES = ["created", "queued", "running", "finished", "canceled", "error"]
+
+
+class JobFilterDialog(QtWidgets.QDialog):
+    """
+    Dialog to define a filter for the batch jobs in the local job index.
+    """
+
+    def __init__(self, filter=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Filter Batch Jobs")
+        filter = filter or JobFilter()
+
+        self.statusBox = QtWidgets.QComboBox()
+        self.statusBox.addItem("Any", None)
+        for status in STATUSES:
+            self.statusBox.addItem(status, status)
+        self.statusBox.setCurrentIndex(
+            max(0, self.statusBox.findData(filter.status))
+        )
+
+        self.titleEdit = QtWidgets.QLineEdit(filter.title or "")
+        self.titleEdit.setPlaceholderText("Part of the title or id")
+
+        # the end date is inclusive in the dialog, but exclusive in the filter
+        until = filter.until - timedelta(days=1) if filter.until else None
+        self.sinceCheck, self.sinceEdit = self.createDateEdit(filter.since)
+        self.untilCheck, self.untilEdit = self.createDateEdit(until)
+
+        self.minCostsCheck, self.minCostsEdit = self.createCostsEdit(
+            filter.minCosts
+        )
+        self.maxCostsCheck, self.maxCostsEdit = self.createCostsEdit(
+            filter.maxCosts
+        )
+
+        form = QtWidgets.QFormLayout()
+        form.addRow("Status", self.statusBox)
+        form.addRow("Title", self.titleEdit)
+        form.addRow(
+            "Created from", self.createRow(self.sinceCheck, self.sinceEdit)
+        )
+        form.addRow(
+            "Created until", self.createRow(self.untilCheck, self.untilEdit)
+        )
+        form.addRow(
+            "Minimum costs",
+            self.createRow(self.minCostsCheck, self.minCostsEdit),
+        )
+        form.addRow(
+            "Maximum costs",
+            self.createRow(self.maxCostsCheck, self.maxCostsEdit),
+        )
+
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.StandardButton.Ok
+            | QtWidgets.QDialogButtonBox.StandardButton.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        hint = QtWidgets.QLabel(
+            "Only the batch jobs that have been listed before are searched. "
+            "Use 'Load all batch jobs' to include all of them."
+        )
+        hint.setWordWrap(True)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(hint)
+        layout.addWidget(buttons)
+
+    def createDateEdit(self, value):
+        check = QtWidgets.QCheckBox()
+        edit = QtWidgets.QDateEdit()
+        edit.setCalendarPopup(True)
+        edit.setDisplayFormat("yyyy-MM-dd")
+        if value is not None:
+            edit.setDate(QDate(value.year, value.month, value.day))
+        else:
+            edit.setDate(QDate.currentDate())
+        self.connectCheck(check, edit, value is not None)
+        return check, edit
+
+    def createCostsEdit(self, value):
+        check = QtWidgets.QCheckBox()
+        edit = QtWidgets.QDoubleSpinBox()
+        edit.setDecimals(2)
+        edit.setMaximum(1e9)
+        if value is not None:
+            edit.setValue(value)
+        self.connectCheck(check, edit, value is not None)
+        return check, edit
+
+    def connectCheck(self, check, edit, checked):
+        check.toggled.connect(edit.setEnabled)
+        check.setChecked(checked)
+        edit.setEnabled(checked)
+
+    def createRow(self, check, edit):
+        row = QtWidgets.QHBoxLayout()
+        row.addWidget(check)
+        row.addWidget(edit, 1)
+        return row
+
+    def getDate(self, check, edit):
+        if not check.isChecked():
+            return None
+        date = edit.date()
+        return datetime(date.year(), date.month(), date.day())
+
+    def getFilter(self):
+        until = self.getDate(self.untilCheck, self.untilEdit)
+        return JobFilter(
+            status=self.statusBox.currentData(),
+            title=self.titleEdit.text().strip() or None,
+            since=self.getDate(self.sinceCheck, self.sinceEdit),
+            until=until + timedelta(days=1) if until else None,
+            minCosts=(
+                self.minCostsEdit.value()
+                if self.minCostsCheck.isChecked()
+                else None
+            ),
+            maxCosts=(
+                self.maxCostsEdit.value()
+                if self.maxCostsCheck.isChecked()
+                else None
+            ),
+        )
@@ -1,9 +1,6 @@
 import json
-import openeo
 import uuid
 
-from ..utils.PluginRefreshTokenStore import PluginRefreshTokenStore
-
 
 class ConnectionModel:
     def __init__(self, name, url, id=None):
@@ -23,6 +20,10 @@ class ConnectionModel:
         return cls(name=name, url=url, id=id)
 
     def connect(self):
+        # openeo is imported on first use to keep the plugin startup fast
+        import openeo
+        from ..utils.PluginRefreshTokenStore import PluginRefreshTokenStore
+
         refreshTokenStore = PluginRefreshTokenStore(self.id)
         return openeo.rest.connection.Connection(
             self.url, refresh_token_store=refreshTokenStore
@@ -1,11 +1,31 @@
 import base64
+import copy
 import json
+import threading
 import time
 
 from qgis.core import QgsSettings
 
 from ..utils.settings import SettingsPath
 
+# Seconds to wait for more changes before writing the logins to the settings
+FLUSH_DELAY = 0.5
+
+
+def parseJWT(token):
+    """Returns the payload of a JWT or None if it's not a valid JWT"""
+    if not isinstance(token, str):
+        return None
+    try:
+        payload_part = token.split(".")[1]
+        padding = "=" * (4 - len(payload_part) % 4)
+        payload_part += padding
+        decoded_bytes = base64.urlsafe_b64decode(payload_part)
+        payload = json.loads(decoded_bytes)
+        return payload
+    except Exception:
+        return None
+
 
 class CredentialsModel:
     def __init__(self, id, loginType, credentials={}):
@@ -40,23 +60,10 @@ class CredentialsModel:
         else:
             return cls(id, loginType, data.get("credentials"))
 
-    def _parseJWT(self, token):
-        if not isinstance(token, str):
-            return None
-        try:
-            payload_part = token.split(".")[1]
-            padding = "=" * (4 - len(payload_part) % 4)
-            payload_part += padding
-            decoded_bytes = base64.urlsafe_b64decode(payload_part)
-            payload = json.loads(decoded_bytes)
-            return payload
-        except Exception:
-            return None
-
     def isExpired(self):
         if self.loginType == "oidc":
             token = self.credentials.get("refresh_token")
-            payload = self._parseJWT(token)
+            payload = parseJWT(token)
             current_time = int(time.time())
             if payload and current_time > payload.get("exp", current_time):
                 return True
@@ -74,45 +81,82 @@ class CredentialsModel:
 
 
 class Credentials:
+    """Access to the saved logins.
+
+    All instances share a process-wide cache of the logins, indexed by
+    connection id and loaded from the settings once. The cache can be used
+    from several threads. Changes are written back to the settings in
+    batches, shortly after they happen.
+    """
+
+    _logins = None
+    _lock = threading.RLock()
+    _flushTimer = None
+
     def __init__(self):
-        self.settings = QgsSettings()
         self.key = SettingsPath.SAVED_LOGINS.value
 
+    def _cache(self) -> dict[str, dict]:
+        # callers must hold the lock
+        if Credentials._logins is None:
+            logins = QgsSettings().value(self.key) or []
+            Credentials._logins = {login["id"]: login for login in logins}
+        return Credentials._logins
+
     def get(self, id: str) -> CredentialsModel | None:
-        logins = self.settings.value(self.key)
-        for login in logins:
-            if login["id"] == str(id):
-                return CredentialsModel.fromStore(login)
-        return None
+        with self._lock:
+            login = self._cache().get(str(id))
+            if login is None:
+                return None
+            # callers may modify the credentials
+            return CredentialsModel.fromStore(copy.deepcopy(login))
 
     def _load(self) -> list[dict]:
-        return self.settings.value(self.key) or []
+        with self._lock:
+            return list(self._cache().values())
 
     def update(self, version):
-        logins = self._load()
-        new_logins = []
-        for login in logins:
-            credentials = CredentialsModel.fromStore(login, version)
-            if credentials and not credentials.isExpired():
-                new_logins.append(login)
-
-        self.settings.setValue(self.key, new_logins)
+        with self._lock:
+            new_logins = {}
+            for id, login in self._cache().items():
+                credentials = CredentialsModel.fromStore(login, version)
+                if credentials and not credentials.isExpired():
+                    new_logins[id] = login
+            Credentials._logins = new_logins
+            self.flush()
 
     def remove(self, id):
-        logins = self._load()
-        new_logins = []
-        for login in logins:
-            if login["id"] != str(id):
-                new_logins.append(login)
-
-        self.settings.setValue(self.key, new_logins)
+        with self._lock:
+            if self._cache().pop(str(id), None) is not None:
+                self._scheduleFlush()
 
     def add(self, credential: CredentialsModel):
-        self.remove(credential.id)
-
-        logins = self._load()
-        logins.append(credential.toDict())
-        self.settings.setValue(self.key, logins)
+        login = copy.deepcopy(credential.toDict())
+        with self._lock:
+            logins = self._cache()
+            # re-insert to keep the order in which the logins were added
+            logins.pop(login["id"], None)
+            logins[login["id"]] = login
+            self._scheduleFlush()
 
     def clear(self):
-        self.settings.setValue(self.key, [])
+        with self._lock:
+            Credentials._logins = {}
+            self.flush()
+
+    def flush(self):
+        """Writes pending changes into the settings"""
+        with self._lock:
+            if Credentials._flushTimer is not None:
+                Credentials._flushTimer.cancel()
+                Credentials._flushTimer = None
+            if Credentials._logins is None:
+                return
+            QgsSettings().setValue(self.key, self._load())
+
+    def _scheduleFlush(self):
+        if Credentials._flushTimer is None:
+            timer = threading.Timer(FLUSH_DELAY, self.flush)
+            timer.daemon = True
+            Credentials._flushTimer = timer
+            timer.start()
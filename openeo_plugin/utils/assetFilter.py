@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+from .filetypes import EXTENSIONS, FILETYPES, MEDIATYPES
+
+NO_ROLE = "(no role)"
+OTHER_TYPE = "other"
+
+
+def getRoles(asset):
+    return asset.get("roles") or [NO_ROLE]
+
+
+def getFileType(asset):
+    """Returns the name of the file type in FILETYPES, detected like
+    OpenEOStacAssetItem.detectFileType(), or 'other'"""
+    fileType = MEDIATYPES.get(asset.get("type", "").lower())
+    if fileType is None:
+        path = Path(urlparse(asset.get("href", "")).path)
+        fileType = EXTENSIONS.get(path.suffix.lower().lstrip("."))
+    for name, candidate in FILETYPES.items():
+        if candidate is fileType:
+            return name
+    return OTHER_TYPE
+
+
+def getBands(asset):
+    """Returns the band names of the asset from eo:bands or bands"""
+    bands = asset.get("eo:bands") or asset.get("bands") or []
+    return [band["name"] for band in bands if band.get("name")]
+
+
+def getAssetSizes(assetItems, concurrency):
+    """Returns the size of each asset by key, from file:size or a HEAD
+    request, or None if it is unknown. The requests are made in parallel.
+    Runs in a background task."""
+    sizes = {}
+    missing = []
+    for item in assetItems:
+        size = item.asset.get("file:size")
+        if size:
+            sizes[item.key] = size
+        else:
+            missing.append(item)
+
+    def head(item):
+        try:
+            return item.headAsset(item.resolveUrl())["size"]
+        except Exception:
+            return None
+
+    if missing:
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="openeo-head"
+        ) as executor:
+            for item, size in zip(missing, executor.map(head, missing)):
+                sizes[item.key] = size
+    return sizes
+
+
+class AssetFilter:
+    """Selects the assets of job results to download.
+
+    Criteria that are None are ignored. The bands are only compared for
+    assets that list their bands.
+    """
+
+    def __init__(
+        self, roles=None, fileTypes=None, bands=None, maxSize=None, sizes=None
+    ):
+        self.roles = roles
+        self.fileTypes = fileTypes
+        self.bands = bands
+        self.maxSize = maxSize  # bytes
+        self.sizes = sizes or {}  # asset key -> size, see getAssetSizes()
+
+    def getSize(self, key, asset):
+        return self.sizes.get(key) or asset.get("file:size")
+
+    def matches(self, key, asset):
+        if self.roles is not None:
+            if not set(getRoles(asset)) & set(self.roles):
+                return False
+        if self.fileTypes is not None:
+            if getFileType(asset) not in self.fileTypes:
+                return False
+        if self.bands is not None:
+            bands = getBands(asset)
+            if bands and not set(bands) & set(self.bands):
+                return False
+        if self.maxSize is not None:
+            size = self.getSize(key, asset)
+            if size and size > self.maxSize:
+                return False
+        return True
+
+    def filterItems(self, assetItems):
+        return [
+            item for item in assetItems if self.matches(item.key, item.asset)
+        ]
+
+    def getTotalSize(self, assetItems):
+        """Returns the total size of the selected assets and the number of
+        selected assets with an unknown size"""
+        total = 0
+        unknown = 0
+        for item in self.filterItems(assetItems):
+            size = self.getSize(item.key, item.asset)
+            if size:
+                total += size
+            else:
+                unknown += 1
+        return total, unknown
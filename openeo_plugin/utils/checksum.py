@@ -0,0 +1,74 @@
+import hashlib
+
+# Multihash codes as used by the STAC file extension (file:checksum)
+# see https://github.com/multiformats/multicodec/blob/master/table.csv
+MULTIHASH_ALGORITHMS = {
+    0x11: ("sha1", {}),
+    0x12: ("sha256", {}),
+    0x13: ("sha512", {}),
+    0x14: ("sha3_512", {}),
+    0x15: ("sha3_384", {}),
+    0x16: ("sha3_256", {}),
+    0x17: ("sha3_224", {}),
+    0xD5: ("md5", {}),
+    0xB220: ("blake2b", {"digest_size": 32}),
+    0xB240: ("blake2b", {"digest_size": 64}),
+}
+
+
+def _readVarint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Invalid multihash: truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def parseMultihash(checksum):
+    """Parse a hex-encoded multihash into an algorithm code and a digest"""
+    try:
+        data = bytes.fromhex(checksum)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid multihash: {checksum}")
+    code, pos = _readVarint(data, 0)
+    length, pos = _readVarint(data, pos)
+    digest = data[pos:]
+    if len(digest) != length:
+        raise ValueError(f"Invalid multihash: {checksum}")
+    return code, digest
+
+
+def createHash(checksum):
+    """Return a new hashlib object and the expected digest for a multihash.
+
+    Returns (None, None) if the hash algorithm is not supported.
+    """
+    code, digest = parseMultihash(checksum)
+    if code not in MULTIHASH_ALGORITHMS:
+        return None, None
+    name, kwargs = MULTIHASH_ALGORITHMS[code]
+    return hashlib.new(name, **kwargs), digest
+
+
+def hashFile(hash, path, chunkSize=1024 * 1024):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunkSize), b""):
+            hash.update(chunk)
+    return hash
+
+
+def verifyChecksum(path, checksum):
+    """Check a file against a multihash.
+
+    Returns None if the hash algorithm is not supported.
+    """
+    hash, digest = createHash(checksum)
+    if hash is None:
+        return None
+    return hashFile(hash, path).digest() == digest
@@ -0,0 +1,151 @@
+import os
+from pathlib import Path
+
+from qgis.core import QgsTask
+
+from .optimize import DEFAULT_COMPRESSION, getCompression
+
+
+class ClipArea:
+    """The area to clip rasters to: either bounds or a polygon (cutline),
+    each with the CRS it is given in (authid or WKT)"""
+
+    def __init__(self, bounds=None, crs=None, cutline=None):
+        self.bounds = bounds  # (xmin, ymin, xmax, ymax)
+        self.crs = crs
+        self.cutline = cutline  # path of a GeoJSON file
+
+    def getWarpArgs(self):
+        if self.cutline is not None:
+            return {
+                "cutlineDSName": self.cutline,
+                "cutlineSRS": self.crs,
+                "cropToCutline": True,
+            }
+        return {"outputBounds": self.bounds, "outputBoundsSRS": self.crs}
+
+    def cleanup(self):
+        if self.cutline is not None:
+            Path(self.cutline).unlink(missing_ok=True)
+
+
+class ClipAssetsTask(QgsTask):
+    """Custom task for downloading the part of raster assets that lies
+    within an area.
+
+    The rasters are read with gdal.Warp through their /vsicurl/ paths, so
+    only the blocks that intersect the area are requested. If a resolution
+    is given, GDAL reads from the matching overview. The results are
+    written as Cloud Optimized GeoTIFFs.
+    """
+
+    def __init__(
+        self,
+        description,
+        dir,
+        area,
+        resolution=None,
+        assets=None,
+        job_item=None,
+    ):
+        super().__init__(description, QgsTask.Flag.CanCancel)
+        self.dir = Path(dir)
+        self.area = area
+        self.resolution = resolution
+        self.assets = assets
+        self.job_item = job_item
+        self.files = []
+        self.errors = 0
+        self.total_assets = 0
+        self.bytes = 0
+        self.exception = None
+        self.canceled = False
+
+    def run(self):
+        """Execute the clipping in the background thread"""
+        try:
+            assets = self.assets
+            if assets is None:
+                self.job_item.populateAssetItems()
+                assets = self.job_item.assetItems
+            sources = [asset.getRasterSource() for asset in assets]
+            sources = [source for source in sources if source]
+            self.total_assets = len(sources)
+
+            for i, source in enumerate(sources):
+                if self.isCanceled():
+                    break
+                try:
+                    self.clip(source, i)
+                except Exception as e:
+                    self.errors += 1
+                    if self.exception is None:
+                        self.exception = e
+
+            if self.isCanceled():
+                self.canceled = True
+                return False
+            return self.errors < self.total_assets or not self.total_assets
+        except Exception as e:
+            self.exception = e
+            return False
+        finally:
+            self.area.cleanup()
+
+    def clip(self, source, i):
+        from osgeo import gdal
+
+        target = self.targetPath(source)
+        total = self.total_assets
+
+        def onProgress(fraction, message, data):
+            self.setProgress((i + fraction) / total * 100)
+            return 0 if self.isCanceled() else 1
+
+        kwargs = self.area.getWarpArgs()
+        if self.resolution:
+            kwargs["xRes"] = kwargs["yRes"] = self.resolution
+            kwargs["targetAlignedPixels"] = True
+        compression = getCompression() or DEFAULT_COMPRESSION
+        options = gdal.WarpOptions(
+            format="COG",
+            # read from the overview that matches the resolution
+            overviewLevel="AUTO",
+            multithread=True,
+            creationOptions=[
+                f"COMPRESS={compression}",
+                "PREDICTOR=YES",
+                "BIGTIFF=IF_SAFER",
+            ],
+            callback=onProgress,
+            **kwargs,
+        )
+        tmp = target.with_name(f"{target.name}.part")
+        try:
+            ds = gdal.Warp(str(tmp), source, options=options)
+            if ds is None:
+                raise ValueError(f"Can't clip {source}.")
+            ds = None
+            os.replace(tmp, target)
+        except RuntimeError as e:
+            # with gdal.UseExceptions()
+            raise ValueError(f"Can't clip {source}: {e}") from e
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        self.bytes += target.stat().st_size
+        self.files.append(target)
+
+    def targetPath(self, source):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(source.split("?", 1)[0]).stem
+        path = self.dir / f"{stem}_clip.tif"
+        i = 2
+        while path.exists():
+            path = self.dir / f"{stem}_clip_({i}).tif"
+            i += 1
+        return path
+
+    def finished(self, result):
+        """Called when task finishes - runs on main thread"""
+        pass
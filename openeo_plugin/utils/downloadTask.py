@@ -1,9 +1,54 @@
-from qgis.core import QgsTask
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from qgis.core import QgsTask, QgsSettings
 from qgis.PyQt.QtCore import pyqtSignal
 
+from .optimize import OptimizeSummary, optimizeRaster
+from .settings import SettingsPath
+from .syncManifest import SyncManifest
+
+DEFAULT_DOWNLOAD_CONCURRENCY = 4
+
+
+class DownloadCanceled(Exception):
+    """Raised by a download when its task has been canceled"""
+
+    pass
+
+
+def getFreePath(path, reserved=(), replace=False):
+    """Returns the path or, if a file exists under it or it is reserved, the
+    path with a number appended to its name. Incomplete downloads are kept
+    in a separate ".part" file, so they are resumed under the same name.
+
+    :param replace: Whether existing files may be replaced, so that only
+        the reserved paths are avoided.
+    """
+    filename = path.stem
+    i = 2
+    while (not replace and path.exists()) or path in reserved:
+        path = path.with_stem(f"{filename}_({i})")
+        i += 1
+    return path
+
+
+def getDownloadConcurrency():
+    concurrency = QgsSettings().value(
+        SettingsPath.DOWNLOAD_CONCURRENCY.value,
+        DEFAULT_DOWNLOAD_CONCURRENCY,
+        type=int,
+    )
+    return max(1, concurrency)
+
 
 class DownloadAssetTask(QgsTask):
-    """Custom task for downloading assets with GUI-safe signals"""
+    """Custom task for downloading assets with GUI-safe signals
+
+    If a compression is given, a downloaded GeoTIFF is converted into a
+    Cloud Optimized GeoTIFF afterwards (see optimizeRaster).
+    """
 
     # Custom signals to communicate with the main thread
     download_complete = pyqtSignal(str, str)  # assetName, dir
@@ -11,20 +56,37 @@ class DownloadAssetTask(QgsTask):
         str, str, Exception
     )  # assetName, dir, exception
 
-    def __init__(self, description, download_func, dir):
+    def __init__(self, description, download_func, dir, optimize=None):
         super().__init__(description, QgsTask.Flag.CanCancel)
         self.download_func = download_func
         self.dir = dir
+        self.optimize = optimize
+        self.summary = OptimizeSummary()
         self.exception = None
+        self.optimizeException = None
 
     def run(self):
         """Execute the download in the background thread"""
         try:
-            self.download_func(dir=self.dir)
-            return True
+            path = self.download_func(
+                dir=self.dir,
+                onProgress=self.updateProgress,
+                isCanceled=self.isCanceled,
+            )
         except Exception as e:
             self.exception = e
             return False
+        if self.optimize and path:
+            try:
+                optimizeRaster(path, self.optimize, self.summary)
+            except Exception as e:
+                # the downloaded file is kept as it is
+                self.optimizeException = e
+        return True
+
+    def updateProgress(self, received, total):
+        if total:
+            self.setProgress(min(received / total, 1) * 100)
 
     def finished(self, result):
         """Called when task finishes - runs on main thread"""
@@ -32,40 +94,221 @@ class DownloadAssetTask(QgsTask):
 
 
 class DownloadJobAssetsTask(QgsTask):
-    """Custom task for downloading job assets with GUI-safe signals"""
+    """Custom task for downloading job assets with GUI-safe signals
+
+    The assets are downloaded by a bounded pool of worker threads. The
+    progress is combined over all assets by the number of bytes received.
+
+    In sync mode, assets that are unchanged compared to the files in the
+    directory are skipped (see SyncManifest).
+
+    If a compression is given, each downloaded GeoTIFF is converted into a
+    Cloud Optimized GeoTIFF by the worker that downloaded it, while the
+    other workers keep downloading.
+
+    If an AssetFilter is given, only the assets that match it are
+    downloaded.
 
-    def __init__(self, description, job_item, dir):
+    Assets with the same file name are saved under unique names, which are
+    reserved before the downloads start (see reservePath). In sync mode,
+    the names are assigned in the order of the assets (see getSyncPaths),
+    so each asset is synced to the same file every time.
+    """
+
+    def __init__(
+        self,
+        description,
+        job_item,
+        dir,
+        concurrency=None,
+        sync=False,
+        optimize=None,
+        assetFilter=None,
+    ):
         super().__init__(description, QgsTask.Flag.CanCancel)
         self.job_item = job_item
         self.dir = dir
+        self.concurrency = concurrency or getDownloadConcurrency()
+        self.manifest = SyncManifest(dir) if sync else None
+        self.optimize = optimize
+        self.assetFilter = assetFilter
+        self.summary = OptimizeSummary()
+        self.optimizeErrors = 0
+        self.optimizeException = None
         self.errors = 0
+        self.skipped = 0
         self.total_assets = 0
         self.exception = None
         self.canceled = False
 
+        self._lock = threading.Lock()
+        self._received = {}
+        self._sizes = {}
+        self._done = set()
+        self._reserved = set()
+        self._syncPaths = {}
+
     def run(self):
         """Execute the download in the background thread"""
         try:
             self.job_item.populateAssetItems()
-            self.total_assets = len(self.job_item.assetItems)
-
-            for i, asset in enumerate(self.job_item.assetItems):
-                if self.isCanceled():
-                    self.canceled = True
-                    return False
-                try:
-                    progress = int((i / self.total_assets) * 100)
-                    self.setProgress(progress)
-                    asset.downloadAsset(dir=self.dir)
-                except Exception as e:
-                    self.errors += 1
-                    # Store first exception for error reporting
-                    if self.exception is None:
-                        self.exception = e
+            assets = self.job_item.assetItems
+            if self.assetFilter is not None:
+                assets = self.assetFilter.filterItems(assets)
+            self.total_assets = len(assets)
+
+            for i, asset in enumerate(assets):
+                self._received[i] = 0
+                if self.assetFilter is not None:
+                    size = self.assetFilter.getSize(asset.key, asset.asset)
+                else:
+                    size = asset.asset.get("file:size")
+                self._sizes[i] = size
+            if self.manifest is not None:
+                self._syncPaths = self.getSyncPaths(assets)
+
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency,
+                thread_name_prefix="openeo-download",
+            ) as executor:
+                pending = {
+                    executor.submit(self.downloadAsset, i, asset)
+                    for i, asset in enumerate(assets)
+                }
+                while pending:
+                    done, pending = wait(
+                        pending, timeout=0.25, return_when=FIRST_COMPLETED
+                    )
+                    for future in done:
+                        self.handleResult(future)
+                    self.setProgress(self.getProgress())
+                    if self.isCanceled():
+                        # Running downloads stop at their next chunk
+                        for future in pending:
+                            future.cancel()
+
+            if self.isCanceled():
+                self.canceled = True
+                return False
             return True
         except Exception as e:
             self.exception = e
             return False
+        finally:
+            if self.manifest is not None:
+                self.saveManifest()
+
+    def saveManifest(self):
+        try:
+            self.manifest.save()
+        except OSError as e:
+            if self.exception is None:
+                self.exception = e
+
+    def downloadAsset(self, i, asset):
+        def onProgress(received, total):
+            with self._lock:
+                self._received[i] = received
+                if total:
+                    self._sizes[i] = total
+
+        if self.manifest is not None:
+            path, downloaded = asset.syncAsset(
+                self.dir,
+                self.manifest,
+                path=self._syncPaths.get(i),
+                onProgress=onProgress,
+                isCanceled=self.isCanceled,
+            )
+        else:
+            path = asset.downloadAsset(
+                dir=self.dir,
+                onProgress=onProgress,
+                isCanceled=self.isCanceled,
+                reservePath=self.reservePath,
+            )
+            downloaded = True
+        with self._lock:
+            self._done.add(i)
+            if self._sizes[i]:
+                self._received[i] = self._sizes[i]
+            if not downloaded:
+                self.skipped += 1
+
+        if downloaded and self.optimize and not self.isCanceled():
+            self.optimizeAsset(path)
+        return path
+
+    def getSyncPaths(self, assets):
+        """Returns the target path of each asset by index. Assets with the
+        same file name get a number appended, instead of replacing each
+        other's files."""
+        paths = {}
+        reserved = set()
+        for i, asset in enumerate(assets):
+            href = asset.resolveUrl()
+            if not href:
+                continue  # fails in syncAsset
+            path = asset.targetPath(Path(self.dir), href)
+            path = getFreePath(path, reserved, replace=True)
+            reserved.add(path)
+            paths[i] = path
+        return paths
+
+    def reservePath(self, path):
+        """Returns a free path for the file, which no other worker of this
+        task will use"""
+        with self._lock:
+            path = getFreePath(path, self._reserved)
+            self._reserved.add(path)
+        return path
+
+    def optimizeAsset(self, path):
+        try:
+            if not optimizeRaster(path, self.optimize, self.summary):
+                return
+        except Exception as e:
+            # the downloaded file is kept as it is
+            with self._lock:
+                self.optimizeErrors += 1
+                if self.optimizeException is None:
+                    self.optimizeException = e
+            return
+        if self.manifest is not None:
+            # the local file has changed, but still matches the asset
+            entry = self.manifest.get(path)
+            if entry:
+                self.manifest.set(path, entry)
+
+    def handleResult(self, future):
+        if future.cancelled():
+            return
+        e = future.exception()
+        if e is None or isinstance(e, DownloadCanceled):
+            return
+        self.errors += 1
+        # Store first exception for error reporting
+        if self.exception is None:
+            self.exception = e
+
+    def getProgress(self):
+        with self._lock:
+            known = [size for size in self._sizes.values() if size]
+            # weigh assets of unknown size with the average known size
+            fallback = sum(known) / len(known) if known else 1
+            total = 0
+            received = 0
+            for i, size in self._sizes.items():
+                if size:
+                    received += min(self._received[i], size)
+                else:
+                    size = fallback
+                    if i in self._done:
+                        received += size
+                total += size
+        if total == 0:
+            return 0
+        return received / total * 100
 
     def finished(self, result):
         """Called when task finishes - runs on main thread"""
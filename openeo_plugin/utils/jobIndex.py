@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+
+INDEX_NAME = "jobs.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    status TEXT,
+    created TEXT,
+    updated TEXT,
+    costs REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created);
+"""
+
+
+def normalizeDate(value):
+    """Converts an RFC 3339 date-time into a UTC string that sorts and
+    compares chronologically, or returns None if it can't be parsed"""
+    if isinstance(value, datetime):
+        date = value
+    elif value:
+        try:
+            date = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class JobFilter:
+    """Criteria for searching the job index. Criteria that are None are
+    ignored."""
+
+    def __init__(
+        self,
+        status=None,
+        title=None,
+        since=None,
+        until=None,
+        minCosts=None,
+        maxCosts=None,
+    ):
+        self.status = status
+        self.title = title
+        self.since = since  # datetime, inclusive
+        self.until = until  # datetime, exclusive
+        self.minCosts = minCosts
+        self.maxCosts = maxCosts
+
+    def toSql(self):
+        """Returns the WHERE clause and its parameters"""
+        conditions = []
+        params = []
+        if self.status:
+            conditions.append("status = ?")
+            params.append(self.status)
+        if self.title:
+            conditions.append("instr(lower(coalesce(title, id)), ?) > 0")
+            params.append(self.title.lower())
+        if self.since is not None:
+            conditions.append("created >= ?")
+            params.append(normalizeDate(self.since))
+        if self.until is not None:
+            conditions.append("created < ?")
+            params.append(normalizeDate(self.until))
+        if self.minCosts is not None:
+            conditions.append("costs >= ?")
+            params.append(self.minCosts)
+        if self.maxCosts is not None:
+            conditions.append("costs <= ?")
+            params.append(self.maxCosts)
+        return " AND ".join(conditions) or "1", params
+
+    def describe(self):
+        parts = []
+        if self.status:
+            parts.append(self.status)
+        if self.title:
+            parts.append(f"“{self.title}”")
+        if self.since is not None or self.until is not None:
+            since = self.since.strftime("%Y-%m-%d") if self.since else "…"
+            until = self.until.strftime("%Y-%m-%d") if self.until else "…"
+            parts.append(f"{since} – {until}")
+        if self.minCosts is not None or self.maxCosts is not None:
+            minCosts = "…" if self.minCosts is None else f"{self.minCosts:g}"
+            maxCosts = "…" if self.maxCosts is None else f"{self.maxCosts:g}"
+            parts.append(f"costs {minCosts} – {maxCosts}")
+        return ", ".join(parts) or "all"
+
+
+class JobIndex:
+    """Local index of the batch jobs of a connection.
+
+    The index is a SQLite database that is updated with every listing of
+    batch jobs that is requested from the backend, so that the jobs seen
+    so far can be searched without any request. A complete listing also
+    removes the jobs that have been deleted on the backend.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, INDEX_NAME)
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def connect(self):
+        if not self._initialized:
+            os.makedirs(self.directory, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            db.executescript(_SCHEMA)
+            self._initialized = True
+        return db
+
+    def update(self, jobs, complete=False):
+        """Stores the jobs of a listing. If the listing is complete, all
+        other jobs are removed from the index."""
+        rows = [
+            (
+                job["id"],
+                job.get("title"),
+                job.get("status"),
+                normalizeDate(job.get("created")),
+                normalizeDate(job.get("updated")),
+                self._getCosts(job),
+                json.dumps(job),
+            )
+            for job in jobs
+            if job.get("id")
+        ]
+        with self._lock, closing(self.connect()) as db, db:
+            if complete:
+                db.execute(
+                    "DELETE FROM jobs WHERE id NOT IN "
+                    "(SELECT value FROM json_each(?))",
+                    (json.dumps([row[0] for row in rows]),),
+                )
+            db.executemany(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET "
+                # keep details that are missing from the listing
+                "title = coalesce(excluded.title, title), "
+                "status = coalesce(excluded.status, status), "
+                "created = coalesce(excluded.created, created), "
+                "updated = coalesce(excluded.updated, updated), "
+                "costs = coalesce(excluded.costs, costs), "
+                "data = json_patch(data, excluded.data)",
+                rows,
+            )
+
+    def query(self, filter=None):
+        """Returns the jobs that match the filter, newest first"""
+        where, params = (filter or JobFilter()).toSql()
+        with self._lock, closing(self.connect()) as db:
+            rows = db.execute(
+                f"SELECT data FROM jobs WHERE {where} "
+                "ORDER BY created DESC, id",
+                params,
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def clear(self):
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._initialized = False
+
+    @staticmethod
+    def _getCosts(job):
+        try:
+            return float(job["costs"])
+        except (KeyError, TypeError, ValueError):
+            return None
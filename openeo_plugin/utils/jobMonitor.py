@@ -0,0 +1,173 @@
+import time
+
+from qgis.PyQt.QtCore import QTimer
+
+from .loadTask import LoadTask
+
+MIN_POLL_INTERVAL = 10  # seconds
+MAX_POLL_INTERVAL = 300  # seconds
+# Update the jobs with a single job listing if at least this many are due
+BATCH_THRESHOLD = 2
+
+
+class JobMonitor:
+    """Polls the status of the active batch jobs of a jobs group in the
+    background.
+
+    Each job is checked with an exponential backoff, which starts over
+    when its status changes. If several jobs are due, they are updated
+    with a single job listing request. Once a job is done, its results
+    metadata is loaded and the user is notified.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.plugin = group.plugin
+        self.jobs = {}  # job id -> (time of the next check, interval)
+        self.task = None
+        self.resultTasks = set()
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.poll)
+
+    def update(self, items):
+        """Tracks the active jobs among the items and forgets the others"""
+        active = set()
+        for item in items:
+            if hasattr(item, "isActive") and item.isActive():
+                active.add(item.getId())
+                self.track(item.getId())
+        for id in list(self.jobs):
+            if id not in active:
+                del self.jobs[id]
+        self.scheduleNext()
+
+    def track(self, id):
+        if id not in self.jobs:
+            nextCheck = time.time() + MIN_POLL_INTERVAL
+            self.jobs[id] = (nextCheck, MIN_POLL_INTERVAL)
+
+    def stop(self):
+        self.jobs = {}
+        self.timer.stop()
+
+    def scheduleNext(self):
+        self.timer.stop()
+        if not self.jobs or self.task is not None:
+            return
+        nextCheck = min(check for check, _ in self.jobs.values())
+        self.timer.start(int(max(0, nextCheck - time.time()) * 1000))
+
+    def getItems(self):
+        try:
+            return {
+                item.getId(): item
+                for item in self.group.children()
+                if hasattr(item, "setJob")
+            }
+        except RuntimeError:
+            return None  # the group has been deleted
+
+    def poll(self):
+        now = time.time()
+        due = [id for id, (check, _) in self.jobs.items() if check <= now]
+        if not due:
+            self.scheduleNext()
+            return
+        if self.getItems() is None:
+            self.stop()
+            return
+
+        if len(due) >= BATCH_THRESHOLD:
+            limit = self.group.getListingLimit()
+            task = LoadTask(
+                "Update batch jobs", lambda: self.fetchListing(due, limit)
+            )
+        else:
+            task = LoadTask("Update batch job", lambda: self.describeJobs(due))
+
+        def on_failed(e):
+            self.task = None
+            self.plugin.logging.debug(
+                "Can't update the status of batch jobs.", error=e
+            )
+            self.backOff(due)
+            self.scheduleNext()
+
+        task.loaded.connect(self.applyUpdates)
+        task.failed.connect(on_failed)
+        self.task = task.start()
+
+    def fetchListing(self, due, limit):
+        """Requests the listing and describes due jobs that are not part of
+        it. Runs in a background task."""
+        jobs = self.group.fetchJobs(limit)
+        if jobs is None:
+            return None
+        updates = {job["id"]: job for job in jobs if job["id"] in due}
+        missing = [id for id in due if id not in updates]
+        updates.update(self.describeJobs(missing))
+        return updates
+
+    def describeJobs(self, ids):
+        """Runs in a background task"""
+        connection = self.group.getConnection()
+        updates = {id: connection.job(id).describe() for id in ids}
+        self.group.indexJobs(updates.values())
+        return updates
+
+    def backOff(self, ids):
+        now = time.time()
+        for id in ids:
+            if id in self.jobs:
+                interval = min(self.jobs[id][1] * 2, MAX_POLL_INTERVAL)
+                self.jobs[id] = (now + interval, interval)
+
+    def applyUpdates(self, updates):
+        self.task = None
+        items = self.getItems()
+        if updates is None or items is None:
+            # not authenticated anymore or the group has been deleted
+            self.stop()
+            return
+
+        now = time.time()
+        unchanged = []
+        for id, job in updates.items():
+            item = items.get(id)
+            if item is None or id not in self.jobs:
+                self.jobs.pop(id, None)
+                continue
+            status = item.getStatus()
+            item.setJob(job, item.index)
+            if not item.isActive():
+                del self.jobs[id]
+                if item.getStatus() != status:
+                    self.onJobDone(item)
+            elif item.getStatus() != status:
+                self.jobs[id] = (now + MIN_POLL_INTERVAL, MIN_POLL_INTERVAL)
+            else:
+                unchanged.append(id)
+        self.backOff(unchanged)
+        self.scheduleNext()
+
+    def onJobDone(self, item):
+        status = item.getStatus()
+        title = item.getTitle()
+        if status == "finished":
+            self.plugin.logging.success(f"Batch job {title} has finished.")
+        elif status == "error":
+            self.plugin.logging.warning(f"Batch job {title} has failed.")
+        else:
+            self.plugin.logging.info(f"Batch job {title} is {status}.")
+
+        if status == "finished":
+            # load the results metadata once, on the transition to finished
+            task = LoadTask(f"Load results of batch job {title}", item.getJob)
+
+            def on_done(*args):
+                self.resultTasks.discard(task)
+
+            task.loaded.connect(on_done)
+            task.failed.connect(on_done)
+            self.resultTasks.add(task.start())
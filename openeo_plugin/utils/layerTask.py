@@ -0,0 +1,192 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from qgis.core import QgsApplication, QgsRasterLayer, QgsTask
+from qgis.PyQt.QtCore import pyqtSignal
+
+from .downloadTask import getDownloadConcurrency
+from .mosaic import buildMosaic, groupRasters, readSignature
+
+
+class CreateLayersTask(QgsTask):
+    """Custom task for creating the layers of job assets with GUI-safe signals
+
+    The layers are opened by a bounded pool of worker threads, as each of
+    them may need several HTTP requests. They are moved to the main thread
+    and handed over in batches, in the order of the assets.
+
+    If a directory for mosaics is given, raster assets of the same time step
+    with the same bands, data types, CRS and resolution whose footprints
+    don't overlap are combined into a VRT mosaic that is added as a single
+    layer. The other assets get a layer each.
+    """
+
+    layersCreated = pyqtSignal(object)  # list of QgsMapLayer
+
+    def __init__(
+        self, description, job_item, concurrency=None, mosaicDir=None
+    ):
+        super().__init__(description, QgsTask.Flag.CanCancel)
+        self.job_item = job_item
+        self.concurrency = concurrency or getDownloadConcurrency()
+        self.mosaicDir = mosaicDir
+        self.mosaics = 0
+        self.errors = 0
+        self.total_assets = 0
+        self.exception = None
+        self.canceled = False
+
+        self._lock = threading.Lock()
+        self._mainThread = QgsApplication.instance().thread()
+
+    def run(self):
+        """Execute the layer creation in the background thread"""
+        try:
+            self.job_item.populateAssetItems()
+            assets = self.job_item.assetItems
+            self.total_assets = len(assets)
+
+            with ThreadPoolExecutor(
+                max_workers=self.concurrency,
+                thread_name_prefix="openeo-layers",
+            ) as executor:
+                if self.mosaicDir is not None:
+                    assets = self.createMosaics(executor, assets)
+                self.createAssetLayers(executor, assets)
+
+            if self.isCanceled():
+                self.canceled = True
+                return False
+            return True
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def createAssetLayers(self, executor, assets):
+        """Creates the layers of the assets and hands them over in order"""
+        # assets that are part of a mosaic are done already
+        offset = self.total_assets - len(assets)
+        results = {}
+        nextIndex = 0
+        futures = {
+            executor.submit(self.createLayers, asset): i
+            for i, asset in enumerate(assets)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(
+                pending, timeout=0.25, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                results[futures[future]] = self.handleResult(future)
+
+            # hand over all layers up to the first unfinished asset
+            batch = []
+            while nextIndex in results:
+                batch.extend(results.pop(nextIndex))
+                nextIndex += 1
+            if batch and not self.isCanceled():
+                self.layersCreated.emit(batch)
+
+            if self.total_assets:
+                self.setProgress(
+                    (offset + nextIndex) / self.total_assets * 100
+                )
+            if self.isCanceled():
+                for future in pending:
+                    future.cancel()
+
+    def createMosaics(self, executor, assets):
+        """Combines compatible raster assets into mosaics and returns the
+        assets that still need a layer of their own"""
+        candidates = []
+        for i, asset in enumerate(assets):
+            source = asset.getRasterSource()
+            if source:
+                candidates.append((i, asset, source))
+        if len(candidates) < 2:
+            return assets
+
+        # the headers are cached by GDAL, so building the VRT is cheap
+        futures = [
+            executor.submit(readSignature, source)
+            for _, _, source in candidates
+        ]
+        rasters = []
+        indices = {}
+        for (i, asset, source), future in zip(candidates, futures):
+            if self.isCanceled():
+                for future in futures:
+                    future.cancel()
+                return []
+            try:
+                signature = future.result()
+            except Exception:
+                signature = None
+            if signature is not None:
+                rasters.append((asset.getTimeStep(), source, signature))
+                indices[source] = i
+
+        groups = groupRasters(rasters)
+        mosaicked = set()
+        for time, signature, sources in groups:
+            if len(sources) < 2 or self.isCanceled():
+                continue
+            name = self.getMosaicName(time, signature, len(groups) > 1)
+            try:
+                path = buildMosaic(sources, self.mosaicDir, name)
+            except Exception as e:
+                # fall back to a layer per asset
+                self.job_item.plugin.logging.debug(
+                    f"Can't create the mosaic {name}.", error=e
+                )
+                continue
+            layer = QgsRasterLayer(path, name, "gdal")
+            if not layer.isValid():
+                continue
+            layer.moveToThread(self._mainThread)
+            self.layersCreated.emit([layer])
+            self.mosaics += 1
+            mosaicked.update(indices[source] for source in sources)
+
+        return [asset for i, asset in enumerate(assets) if i not in mosaicked]
+
+    def getMosaicName(self, time, signature, describeBands):
+        details = []
+        if time:
+            details.append(time)
+        if describeBands:
+            details.append(signature.describeBands())
+        name = f"{self.job_item.getTitle()} mosaic"
+        if details:
+            name += f" ({', '.join(details)})"
+        return name
+
+    def createLayers(self, asset):
+        if self.isCanceled():
+            return []
+        layers, errored = asset.createLayers(addToProject=False)
+        for layer in layers:
+            # layers must live in the main thread to be added to the project
+            layer.moveToThread(self._mainThread)
+        if errored:
+            with self._lock:
+                self.errors += errored
+        return layers
+
+    def handleResult(self, future):
+        if future.cancelled():
+            return []
+        e = future.exception()
+        if e is not None:
+            with self._lock:
+                self.errors += 1
+            # Store first exception for error reporting
+            if self.exception is None:
+                self.exception = e
+            return []
+        return future.result()
+
+    def finished(self, result):
+        """Called when task finishes - runs on main thread"""
+        pass
@@ -0,0 +1,90 @@
+from qgis.core import QgsApplication, QgsTask
+from qgis.PyQt.QtCore import pyqtSignal
+
+
+class LoadTask(QgsTask):
+    """Custom task for loading data in the background with GUI-safe signals
+
+    The signals are emitted on the main thread once the task has finished.
+    """
+
+    loaded = pyqtSignal(object)  # result of load_func
+    failed = pyqtSignal(Exception)
+
+    def __init__(self, description, load_func):
+        super().__init__(
+            description,
+            QgsTask.Flag.CanCancel
+            | QgsTask.Flag.CancelWithoutPrompt
+            | QgsTask.Flag.Hidden,
+        )
+        self.load_func = load_func
+        self.result = None
+        self.exception = None
+
+    def run(self):
+        """Execute the loading in the background thread"""
+        try:
+            self.result = self.load_func()
+            return True
+        except Exception as e:
+            self.exception = e
+            return False
+
+    def finished(self, result):
+        """Called when task finishes - runs on main thread"""
+        if result:
+            self.loaded.emit(self.result)
+        elif self.exception is not None:
+            self.failed.emit(self.exception)
+
+    def start(self):
+        QgsApplication.taskManager().addTask(self)
+        return self
+
+
+class StreamTask(QgsTask):
+    """Custom task for loading data in chunks in the background with
+    GUI-safe signals
+
+    Each chunk yielded by stream_func is handed over to the main thread
+    right away. Canceling the task stops it before the next chunk.
+    """
+
+    chunkLoaded = pyqtSignal(object)  # chunk yielded by stream_func
+    completed = pyqtSignal(bool)  # whether all chunks have been loaded
+    failed = pyqtSignal(Exception)
+
+    def __init__(self, description, stream_func):
+        super().__init__(
+            description,
+            QgsTask.Flag.CanCancel | QgsTask.Flag.CancelWithoutPrompt,
+        )
+        self.stream_func = stream_func
+        self.exception = None
+
+    def run(self):
+        """Execute the loading in the background thread"""
+        chunks = self.stream_func()
+        try:
+            for chunk in chunks:
+                if self.isCanceled():
+                    return False
+                self.chunkLoaded.emit(chunk)
+            return True
+        except Exception as e:
+            self.exception = e
+            return False
+        finally:
+            chunks.close()
+
+    def finished(self, result):
+        """Called when task finishes - runs on main thread"""
+        if self.exception is not None:
+            self.failed.emit(self.exception)
+        else:
+            self.completed.emit(result)
+
+    def start(self):
+        QgsApplication.taskManager().addTask(self)
+        return self
@@ -0,0 +1,130 @@
+import hashlib
+import os
+
+# Only these formats are combined, other rasters (e.g. netCDF with several
+# subdatasets) are added as separate layers
+MOSAIC_FORMATS = ["GTiff"]
+
+
+class RasterSignature:
+    """The properties that the rasters of a mosaic must have in common"""
+
+    def __init__(self, ds):
+        from osgeo import osr
+
+        bands = [ds.GetRasterBand(i + 1) for i in range(ds.RasterCount)]
+        self.dataTypes = tuple(band.DataType for band in bands)
+        self.descriptions = tuple(band.GetDescription() for band in bands)
+        self.nodata = tuple(band.GetNoDataValue() for band in bands)
+
+        # None for rotated rasters, which aren't mosaicked
+        self.pixelSize = None
+        self.extent = None
+        gt = ds.GetGeoTransform(can_return_null=True)
+        if gt and gt[2] == 0 and gt[4] == 0:
+            self.pixelSize = (gt[1], gt[5])
+            x = (gt[0], gt[0] + gt[1] * ds.RasterXSize)
+            y = (gt[3], gt[3] + gt[5] * ds.RasterYSize)
+            self.extent = (min(x), min(y), max(x), max(y))
+
+        self.crs = ds.GetProjection()
+        srs = osr.SpatialReference()
+        if self.crs and srs.ImportFromWkt(self.crs) == 0:
+            srs.AutoIdentifyEPSG()
+            code = srs.GetAuthorityCode(None)
+            if code:
+                self.crs = f"{srs.GetAuthorityName(None)}:{code}"
+
+    def key(self):
+        return (
+            self.dataTypes,
+            self.descriptions,
+            self.nodata,
+            self.crs,
+            self.pixelSize,
+        )
+
+    def overlaps(self, other):
+        """Whether the footprints overlap, rasters that only share an edge
+        don't"""
+        a, b = self.extent, other.extent
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+    def describeBands(self):
+        names = [d for d in self.descriptions if d]
+        if len(names) == len(self.descriptions):
+            return ", ".join(names)
+        count = len(self.descriptions)
+        return f"{count} band" if count == 1 else f"{count} bands"
+
+
+def readSignature(path):
+    """Opens a raster and returns its RasterSignature or None if it can't
+    be opened. Only the header of the file is read."""
+    from osgeo import gdal
+
+    try:
+        ds = gdal.Open(path, gdal.GA_ReadOnly)
+    except RuntimeError:
+        return None  # with gdal.UseExceptions()
+    if ds is None or ds.RasterCount == 0:
+        return None
+    try:
+        return RasterSignature(ds)
+    finally:
+        ds = None
+
+
+def groupRasters(rasters):
+    """Groups rasters that can be combined into a mosaic.
+
+    Only rasters of a known time step with the same grid resolution are
+    grouped. Groups in which footprints overlap are left out, as the VRT
+    would hide the pixels of all but the last of the overlapping rasters.
+
+    :param rasters: list of (time step or None, path, RasterSignature)
+    :returns: list of (time step, signature, paths) in the order in which
+        the first raster of each group appears
+    """
+    groups = {}
+    overlapping = set()
+    for time, path, signature in rasters:
+        if not time or signature.extent is None:
+            continue
+        key = (time, signature.key())
+        if key not in groups:
+            groups[key] = (time, signature, [], [])
+        if any(signature.overlaps(other) for other in groups[key][3]):
+            overlapping.add(key)
+        groups[key][2].append(path)
+        groups[key][3].append(signature)
+    return [
+        (time, signature, paths)
+        for key, (time, signature, paths, _) in groups.items()
+        if key not in overlapping
+    ]
+
+
+def buildMosaic(paths, directory, name):
+    """Creates a VRT mosaic of the rasters and returns its path.
+
+    The name of the VRT depends on its sources, so that adding the same
+    results again reuses the file.
+    """
+    from osgeo import gdal
+
+    digest = hashlib.sha1("\n".join(paths).encode()).hexdigest()[:16]
+    safeName = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{safeName[:64]}_{digest}.vrt")
+
+    options = gdal.BuildVRTOptions(resampleAlg="nearest")
+    try:
+        ds = gdal.BuildVRT(path, paths, options=options)
+    except RuntimeError as e:
+        raise ValueError(f"Can't build the mosaic {name}: {e}") from e
+    if ds is None:
+        raise ValueError(f"Can't build the mosaic {name}.")
+    ds.FlushCache()
+    ds = None
+    return path
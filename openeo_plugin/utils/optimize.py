@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+from qgis.core import QgsSettings
+
+from .settings import SettingsPath
+
+DEFAULT_COMPRESSION = "ZSTD"
+COMPRESSIONS = ["ZSTD", "DEFLATE", "LZW"]
+RASTER_EXTENSIONS = [".tif", ".tiff"]
+
+
+def isOptimizeEnabled():
+    return QgsSettings().value(
+        SettingsPath.OPTIMIZE_DOWNLOADS.value, False, type=bool
+    )
+
+
+def getCompression():
+    """Returns the compression for optimized rasters or None if rasters
+    shouldn't be optimized after downloading"""
+    if not isOptimizeEnabled():
+        return None
+    compression = (
+        QgsSettings()
+        .value(
+            SettingsPath.OPTIMIZE_COMPRESSION.value,
+            DEFAULT_COMPRESSION,
+            type=str,
+        )
+        .upper()
+    )
+    return compression if compression in COMPRESSIONS else DEFAULT_COMPRESSION
+
+
+def formatBytes(size):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(size) < 1024 or unit == "GB":
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+class OptimizeSummary:
+    """Sums up the space saved and the time spent by optimizing rasters.
+    Can be updated from several threads."""
+
+    def __init__(self):
+        self.files = 0
+        self.sizeBefore = 0
+        self.sizeAfter = 0
+        self.seconds = 0
+        self._lock = threading.Lock()
+
+    def add(self, sizeBefore, sizeAfter, seconds):
+        with self._lock:
+            self.files += 1
+            self.sizeBefore += sizeBefore
+            self.sizeAfter += sizeAfter
+            self.seconds += seconds
+
+    def describe(self):
+        if not self.files:
+            return None
+        saved = self.sizeBefore - self.sizeAfter
+        percent = saved / self.sizeBefore * 100 if self.sizeBefore else 0
+        files = "file" if self.files == 1 else "files"
+        return (
+            f"Optimized {self.files} {files} in {self.seconds:.1f} s: "
+            f"{formatBytes(self.sizeBefore)} → {formatBytes(self.sizeAfter)}"
+            f" ({percent:.0f}% saved)."
+        )
+
+
+def getSupportedCompression(compression):
+    """ZSTD is missing from some GDAL builds, fall back to DEFLATE"""
+    from osgeo import gdal
+
+    driver = gdal.GetDriverByName("COG")
+    if driver is None:
+        return None  # GDAL < 3.1
+    options = driver.GetMetadataItem("DMD_CREATIONOPTIONLIST") or ""
+    return compression if compression in options else "DEFLATE"
+
+
+def optimizeRaster(path, compression, summary=None):
+    """Converts a GeoTIFF into a tiled Cloud Optimized GeoTIFF with internal
+    overviews and the given compression. The file is replaced once the
+    conversion has succeeded.
+
+    :returns: Whether the file has been optimized. Other file types and
+        rasters that GDAL can't read are left as they are.
+    """
+    path = Path(path)
+    if path.suffix.lower() not in RASTER_EXTENSIONS:
+        return False
+
+    from osgeo import gdal
+
+    compression = getSupportedCompression(compression)
+    if compression is None:
+        return False
+
+    start = time.monotonic()
+    sizeBefore = path.stat().st_size
+    tmp = path.with_name(f"{path.name}.optimize.tif")
+    options = gdal.TranslateOptions(
+        format="COG",
+        creationOptions=[
+            f"COMPRESS={compression}",
+            # horizontal differencing for integers, floating point otherwise
+            "PREDICTOR=YES",
+            "BLOCKSIZE=512",
+            # build overviews unless the file has some already
+            "OVERVIEWS=AUTO",
+            "BIGTIFF=IF_SAFER",
+        ],
+    )
+    try:
+        ds = gdal.Translate(str(tmp), str(path), options=options)
+        if ds is None:
+            raise ValueError(f"Can't optimize {path.name}.")
+        ds = None
+        os.replace(tmp, path)
+    except RuntimeError as e:
+        # with gdal.UseExceptions()
+        raise ValueError(f"Can't optimize {path.name}: {e}") from e
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    if summary is not None:
+        summary.add(sizeBefore, path.stat().st_size, time.monotonic() - start)
+    return True
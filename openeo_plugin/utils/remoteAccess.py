@@ -0,0 +1,173 @@
+import json
+import threading
+from urllib.parse import urlparse
+
+from qgis.core import QgsSettings
+
+from .filetypes import EXTENSIONS
+from .settings import SettingsPath
+
+# GDAL configuration options for reading job results through /vsicurl/ and
+# /vsis3/. They are applied per host with SetPathSpecificOption, so they
+# don't change how GDAL accesses other remote files.
+DEFAULT_REMOTE_OPTIONS = {
+    # job results have no sidecar files, so don't list the directory and
+    # don't probe for .aux.xml, .ovr, etc. next to the file
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    # read the header of a COG (incl. tile offsets) with the first request
+    "GDAL_INGESTED_BYTES_AT_OPEN": "32768",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "GDAL_HTTP_MULTIRANGE": "YES",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "GDAL_HTTP_VERSION": "2TLS",  # HTTP/2 for https, HTTP/1.1 otherwise
+    "GDAL_HTTP_MAX_RETRY": "3",
+    "GDAL_HTTP_RETRY_DELAY": "1",
+    "VSI_CACHE": "TRUE",
+}
+
+# Options that GDAL only reads globally. They are set once, unless they
+# have been configured by the user already, and unset again by
+# resetRemoteAccessOptions().
+DEFAULT_GLOBAL_OPTIONS = {
+    # blocks that have been read are kept for all layers of a session
+    "CPL_VSIL_CURL_CACHE_SIZE": str(128 * 1024 * 1024),
+    "VSI_CACHE_SIZE": str(64 * 1024 * 1024),
+}
+
+_lock = threading.Lock()
+_appliedPrefixes = set()
+_globalOptionsApplied = False
+_globalOptions = {}  # global options that have been set, with their values
+
+
+def isRemoteAccessEnabled():
+    return QgsSettings().value(
+        SettingsPath.REMOTE_ACCESS_PROFILE.value, True, type=bool
+    )
+
+
+def getRemoteAccessOptions():
+    """Returns the GDAL options of the remote access profile.
+
+    The defaults can be changed with a JSON object in the setting
+    openeo_plugin/remote_access_options, a null value removes an option.
+    For example, CPL_VSIL_CURL_ALLOWED_EXTENSIONS can be set to
+    getAllowedExtensions() if a backend only serves assets with file
+    extensions (it would reject assets without one).
+    """
+    options = dict(DEFAULT_REMOTE_OPTIONS, **DEFAULT_GLOBAL_OPTIONS)
+    custom = QgsSettings().value(
+        SettingsPath.REMOTE_ACCESS_OPTIONS.value, "", type=str
+    )
+    if custom:
+        try:
+            overrides = json.loads(custom)
+        except ValueError:
+            overrides = {}
+        if isinstance(overrides, dict):
+            options.update(overrides)
+    return {
+        key: str(value) for key, value in options.items() if value is not None
+    }
+
+
+def getAllowedExtensions():
+    return ",".join(sorted(f".{ext}" for ext in EXTENSIONS))
+
+
+def getPathPrefix(path):
+    """Returns the prefix of a /vsicurl/ or /vsis3/ path that the options
+    are applied to: the host or the bucket"""
+    for vsi in ("/vsicurl/", "/vsis3/"):
+        if path.startswith(vsi):
+            location = path[len(vsi) :]
+            break
+    else:
+        return None
+
+    if vsi == "/vsis3/":
+        bucket = location.split("/", 1)[0]
+        return f"{vsi}{bucket}/"
+
+    url = urlparse(location)
+    if not url.scheme or not url.netloc:
+        return None
+    return f"{vsi}{url.scheme}://{url.netloc}/"
+
+
+def applyRemoteAccessOptions(path, logging=None):
+    """Applies the remote access profile to the given /vsicurl/ or /vsis3/
+    path. Safe to call from background tasks and for every layer, the
+    options are only set once per host.
+
+    The profile only tunes how GDAL reads the file, so if the options can't
+    be set, a warning is logged and the path is used without them.
+
+    :param logging: Optional Logging of the plugin for the warning.
+    :returns: The path, unmodified.
+    """
+    prefix = getPathPrefix(path)
+    if prefix is None or not isRemoteAccessEnabled():
+        return path
+
+    try:
+        _applyOptions(prefix)
+    except Exception as e:
+        if logging is not None:
+            logging.warning(
+                f"Can't apply the remote access profile to {prefix}.",
+                error=e,
+            )
+    return path
+
+
+def _applyOptions(prefix):
+    with _lock:
+        if prefix in _appliedPrefixes:
+            return
+
+        from osgeo import gdal
+
+        global _globalOptionsApplied
+        options = getRemoteAccessOptions()
+        if not _globalOptionsApplied:
+            for key in DEFAULT_GLOBAL_OPTIONS:
+                if key in options and gdal.GetConfigOption(key) is None:
+                    gdal.SetConfigOption(key, options[key])
+                    _globalOptions[key] = options[key]
+            _globalOptionsApplied = True
+
+        # GDAL < 3.6 only gets the global options
+        if hasattr(gdal, "SetPathSpecificOption"):
+            try:
+                for key, value in options.items():
+                    if key not in DEFAULT_GLOBAL_OPTIONS:
+                        gdal.SetPathSpecificOption(prefix, key, value)
+            except Exception:
+                # try again with the next layer
+                gdal.ClearPathSpecificOptions(prefix)
+                raise
+        _appliedPrefixes.add(prefix)
+
+
+def resetRemoteAccessOptions():
+    """Removes the options that have been applied, e.g. after the profile
+    has been changed. Global options that have been changed by someone else
+    meanwhile are kept."""
+    global _globalOptionsApplied
+    with _lock:
+        if not _appliedPrefixes and not _globalOptions:
+            _globalOptionsApplied = False
+            return
+
+        from osgeo import gdal
+
+        if hasattr(gdal, "ClearPathSpecificOptions"):
+            for prefix in _appliedPrefixes:
+                gdal.ClearPathSpecificOptions(prefix)
+        for key, value in _globalOptions.items():
+            if gdal.GetConfigOption(key) == value:
+                gdal.SetConfigOption(key, None)
+        _appliedPrefixes.clear()
+        _globalOptions.clear()
+        _globalOptionsApplied = False
@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+
+DEFAULT_CACHE_TTL = 3600  # seconds
+
+
+class ResponseCache:
+    """Persistent cache for JSON responses of an openEO backend.
+
+    Each response is stored as a JSON file together with its HTTP
+    validators (ETag, Last-Modified), so that it can be revalidated with a
+    conditional request once it is older than the TTL.
+    """
+
+    def __init__(self, directory, ttl=DEFAULT_CACHE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def getPath(self, name):
+        return os.path.join(self.directory, f"{quote(name, safe='')}.json")
+
+    def get(self, name):
+        try:
+            with open(self.getPath(name), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, name, entry):
+        path = self.getPath(name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+
+    def isFresh(self, entry):
+        if not entry:
+            return False
+        return time.time() - entry.get("fetched", 0) < self.ttl
+
+    def fetch(self, connection, path, name):
+        """Request the given path and update the cache.
+
+        If the response is cached already, the request is conditional and
+        the server doesn't send the data again if it is unchanged.
+
+        :returns: The cache entry and whether the data has changed.
+        """
+        entry = self.get(name)
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = connection.get(
+            path, headers=headers, expected_status=[200, 304]
+        )
+        if response.status_code == 304 and entry:
+            entry["fetched"] = time.time()
+            self.put(name, entry)
+            return entry, False
+
+        data = response.json()
+        changed = not entry or entry.get("data") != data
+        entry = {
+            "data": data,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched": time.time(),
+        }
+        self.put(name, entry)
+        return entry, changed
+
+    def clear(self):
+        with self._lock:
+            try:
+                names = os.listdir(self.directory)
+            except OSError:
+                return
+            for name in names:
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,80 @@
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Enough connections per host for the parallel downloads plus some headroom
+DEFAULT_POOL_SIZE = 16
+DEFAULT_RETRIES = 3
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class SessionPool:
+    """Thread-safe pool of HTTP sessions, one per host.
+
+    The sessions keep connections alive, so that consecutive requests to
+    the same host (e.g. downloading many assets) don't need a new TCP and
+    TLS handshake each time. Idempotent requests are retried with backoff
+    on connection errors and on the status codes in RETRY_STATUS_CODES.
+
+    Not used for the openEO API, which the openEO Connection handles.
+    """
+
+    def __init__(self, poolSize=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES):
+        self.poolSize = poolSize
+        self.retries = retries
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def getKey(url):
+        pieces = urlparse(url)
+        return pieces.scheme.lower(), pieces.netloc.lower()
+
+    def getSession(self, url):
+        key = self.getKey(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self.createSession()
+                self._sessions[key] = session
+            return session
+
+    def createSession(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+            # return the last response, the callers check the status
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.poolSize, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+        for session in sessions:
+            session.close()
+
+
+_pool = SessionPool()
+
+
+def getSession(url):
+    """Returns the shared session for the host of the given URL"""
+    return _pool.getSession(url)
+
+
+def closeSessions():
+    _pool.close()
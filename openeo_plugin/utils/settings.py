@@ -6,6 +6,14 @@ class SettingsPath(Enum):
     SAVED_CONNECTIONS = "openeo_plugin/saved_connections"
     SAVED_LOGINS = "openeo_plugin/saved_logins"
     PLUGIN_VERSION = "openeo_plugin/version"
+    DOWNLOAD_CONCURRENCY = "openeo_plugin/download_concurrency"
+    CACHE_TTL = "openeo_plugin/cache_ttl"
+    PREFETCH_URIS = "openeo_plugin/prefetch_uris"
+    JOBS_PAGE_SIZE = "openeo_plugin/jobs_page_size"
+    REMOTE_ACCESS_PROFILE = "openeo_plugin/remote_access_profile"
+    REMOTE_ACCESS_OPTIONS = "openeo_plugin/remote_access_options"
+    OPTIMIZE_DOWNLOADS = "openeo_plugin/optimize_downloads"
+    OPTIMIZE_COMPRESSION = "openeo_plugin/optimize_compression"
 
 
 def getOs():
@@ -0,0 +1,64 @@
+import json
+import threading
+from pathlib import Path
+
+MANIFEST_NAME = ".openeo-sync.json"
+
+
+class SyncManifest:
+    """Keeps track of the assets that have been synced into a directory.
+
+    For each file the manifest stores the remote fingerprint of the asset
+    (size, file:checksum, ETag, Last-Modified) and the size and
+    modification time of the local file, which differ from the remote ones
+    once the file has been optimized. If neither has changed since the
+    last sync, the asset doesn't need to be checked on the server again.
+    """
+
+    def __init__(self, dir):
+        self.dir = Path(dir)
+        self.path = self.dir / MANIFEST_NAME
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.entries = data.get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        with self._lock:
+            data = {"version": 1, "files": self.entries}
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        tmp.replace(self.path)
+
+    def key(self, path):
+        return Path(path).relative_to(self.dir).as_posix()
+
+    def get(self, path):
+        with self._lock:
+            return self.entries.get(self.key(path))
+
+    def set(self, path, entry):
+        stat = Path(path).stat()
+        entry = dict(entry, local_size=stat.st_size, mtime=stat.st_mtime_ns)
+        with self._lock:
+            self.entries[self.key(path)] = entry
+
+    def isLocalUnchanged(self, path, entry):
+        """Check whether the local file still is the one that was synced"""
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            return False
+        return (
+            entry.get("local_size") == stat.st_size
+            and entry.get("mtime") == stat.st_mtime_ns
+        )
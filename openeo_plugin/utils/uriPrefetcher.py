@@ -0,0 +1,119 @@
+import itertools
+import queue
+import threading
+
+from qgis.core import QgsApplication, QgsTask
+from qgis.PyQt.QtCore import QObject, pyqtSignal
+
+DEFAULT_PREFETCH_WORKERS = 2
+
+
+class PrefetchTask(QgsTask):
+    """Worker that resolves queued jobs until the queue is empty"""
+
+    def __init__(self, prefetcher):
+        super().__init__(
+            "Prefetch map previews",
+            QgsTask.Flag.CanCancel
+            | QgsTask.Flag.CancelWithoutPrompt
+            | QgsTask.Flag.Hidden,
+        )
+        self.prefetcher = prefetcher
+
+    def run(self):
+        """Execute the jobs in the background thread"""
+        while not self.isCanceled():
+            job = self.prefetcher.takeJob()
+            if job is None:
+                return True
+            self.prefetcher.runJob(job)
+        return False
+
+    def finished(self, result):
+        """Called when task finishes - runs on main thread"""
+        if not result:
+            # canceled, possibly before taking any job
+            self.prefetcher.workerStopped()
+
+
+class UriPrefetcher(QObject):
+    """Resolves data in the background ahead of time.
+
+    Jobs are queued with a priority (lower runs first) and executed by a
+    small pool of worker tasks. Each job consists of a resolve function
+    that runs in a worker thread and an apply function that receives the
+    result on the main thread. Jobs whose resolve function returns None
+    are not applied.
+    """
+
+    resolved = pyqtSignal(object, object)  # apply function, result
+
+    def __init__(self, workers=DEFAULT_PREFETCH_WORKERS):
+        super().__init__()
+        self.workers = workers
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._tasks = []
+        self.resolved.connect(self.applyResult)
+
+    def enqueue(self, resolve, apply, priority=0):
+        # the counter keeps the order of jobs with the same priority
+        self._queue.put((priority, next(self._counter), resolve, apply))
+        with self._lock:
+            if self._running >= self.workers:
+                return
+            self._running += 1
+        task = PrefetchTask(self)
+        self._tasks = [t for t in self._tasks if not self._isDone(t)]
+        self._tasks.append(task)
+        QgsApplication.taskManager().addTask(task)
+
+    def takeJob(self):
+        """Returns the next job or None after stopping the worker"""
+        with self._lock:
+            try:
+                return self._queue.get_nowait()
+            except queue.Empty:
+                self._running -= 1
+                return None
+
+    def workerStopped(self):
+        with self._lock:
+            self._running -= 1
+
+    def runJob(self, job):
+        _, _, resolve, apply = job
+        try:
+            result = resolve()
+        except Exception:
+            # errors are reported by the resolve functions themselves
+            return
+        if result is not None:
+            self.resolved.emit(apply, result)
+
+    def applyResult(self, apply, result):
+        try:
+            apply(result)
+        except RuntimeError:
+            pass  # the browser item has been deleted meanwhile
+
+    def cancel(self):
+        """Drops all queued jobs and stops the workers"""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for task in self._tasks:
+            if not self._isDone(task):
+                task.cancel()
+        self._tasks = []
+
+    @staticmethod
+    def _isDone(task):
+        return task.status() in (
+            QgsTask.TaskStatus.Complete,
+            QgsTask.TaskStatus.Terminated,
+        )
@@ -29,16 +29,25 @@ would be appreciated.
 
 """
 
+from collections import OrderedDict
+import hashlib
+import io
+import json
+import os
 from random import randint
+import threading
+import time
 import warnings
 from urllib.parse import urlencode, urlparse, urlunparse, parse_qs, ParseResult
+import requests
 from owslib.etree import etree
 from owslib.util import (
     clean_ows_url,
     testXMLValue,
     getXMLInteger,
     Authentication,
-    openURL,
+    ResponseWrapper,
+    ServiceException as OWSServiceException,
     getXMLTree,
     nspath,
 )
@@ -48,6 +57,8 @@ from owslib.ows import (
     OperationsMetadata,
 )
 
+from .sessionPool import getSession
+
 
 _OWS_NS = "{http://www.opengis.net/ows/1.1}"
 _WMTS_NS = "{http://www.opengis.net/wmts/1.0}"
@@ -110,17 +121,77 @@ _KEYWORD_TAG = _OWS_NS + "Keyword"
 _HREF_TAG = _XLINK_NS + "href"
 
 
+def openURL(
+    url_base,
+    data=None,
+    method="Get",
+    cookies=None,
+    timeout=30,
+    headers=None,
+    auth=None,
+):
+    """Variant of owslib.util.openURL that reuses the pooled HTTP sessions"""
+    auth = auth or Authentication()
+    rkwargs = {"timeout": timeout, "cert": auth.cert, "verify": auth.verify}
+    if auth.username and auth.password:
+        rkwargs["auth"] = (auth.username, auth.password)
+    elif auth.auth_delegate is not None:
+        rkwargs["auth"] = auth.auth_delegate
+    if cookies is not None:
+        rkwargs["cookies"] = cookies
+    if method.lower() == "post":
+        rkwargs["data"] = data
+    else:
+        rkwargs["params"] = data
+
+    req = getSession(url_base).request(
+        method.upper(), url_base, headers=headers or {}, **rkwargs
+    )
+
+    if req.status_code in [400, 401, 403]:
+        raise OWSServiceException(req.text)
+    if req.status_code in [404, 500, 502, 503, 504]:
+        req.raise_for_status()
+
+    # check for service exceptions without the http header set
+    if req.headers.get("Content-Type") in [
+        "text/xml",
+        "application/xml",
+        "application/vnd.ogc.se_xml",
+    ]:
+        se_tree = etree.fromstring(req.content)
+        for possible_error in [
+            "{http://www.opengis.net/ows}Exception",
+            "{http://www.opengis.net/ows/1.1}Exception",
+            "{http://www.opengis.net/ogc}ServiceException",
+            "ServiceException",
+        ]:
+            serviceException = se_tree.find(possible_error)
+            if serviceException is not None:
+                raise OWSServiceException(
+                    "\n".join(
+                        t.strip()
+                        for t in serviceException.itertext()
+                        if t.strip()
+                    )
+                )
+
+    return ResponseWrapper(req)
+
+
 class ServiceException(Exception):
     """WMTS ServiceException
 
     Attributes:
         message -- short error message
         xml  -- full xml error message from server
+        code -- exception code, if available
     """
 
-    def __init__(self, message, xml):
+    def __init__(self, message, xml, code=None):
         self.message = message
         self.xml = xml
+        self.code = code
 
     def __str__(self):
         return repr(self.message)
@@ -610,6 +681,11 @@ class WebMapTileService(object):
         raise KeyError("No operation named %s" % name)
 
 
+def _getIdentifier(elem):
+    identifier = testXMLValue(elem.find(_IDENTIFIER_TAG))
+    return identifier.strip() if identifier else identifier
+
+
 class TileMatrixSet(object):
     """Holds one TileMatrixSet"""
 
@@ -1102,3 +1178,345 @@ class WMTSCapabilitiesReader:
             msg = "String must be of type string or bytes, not %s" % type(st)
             raise ValueError(msg)
         return etree.fromstring(st)
+
+
+class LayerSummary:
+    """Compact summary of a WMTS layer with the properties of
+    ContentMetadata that are needed to create a layer URI"""
+
+    def __init__(self, elem):
+        self.id = self.name = _getIdentifier(elem)
+        title = testXMLValue(elem.find(_TITLE_TAG))
+        self.title = title.strip() if title else None
+        self.formats = [f.text for f in elem.findall(_FORMAT_TAG)]
+        self.styles = {}
+        for s in elem.findall(_STYLE_TAG):
+            identifier = testXMLValue(s.find(_IDENTIFIER_TAG))
+            if identifier:
+                self.styles[identifier] = {
+                    "isDefault": s.attrib.get("isDefault") == "true"
+                }
+        self.tilematrixsets = [
+            f.text.strip()
+            for f in elem.findall(
+                _TILE_MATRIX_SET_LINK_TAG + "/" + _TILE_MATRIX_SET_TAG
+            )
+            if f.text
+        ]
+
+
+class TileMatrixSetSummary:
+    """Compact summary of a TileMatrixSet without its TileMatrix entries"""
+
+    def __init__(self, elem):
+        self.identifier = _getIdentifier(elem)
+        crs = testXMLValue(elem.find(_SUPPORTED_CRS_TAG))
+        self.crs = crs.strip() if crs else None
+
+
+class CapabilitiesSummary:
+    """Compact summary of a WMTS capabilities document"""
+
+    def __init__(self):
+        self.updateSequence = None
+        self.contents = {}
+        self.tilematrixsets = {}
+
+    def select(self, layers=None):
+        """Returns a summary with only the given layers and their tile
+        matrix sets, or this summary if no layers are given"""
+        if not layers:
+            return self
+        summary = CapabilitiesSummary()
+        summary.updateSequence = self.updateSequence
+        for id in layers:
+            layer = self.contents.get(id)
+            if layer is None:
+                continue
+            summary.contents[id] = layer
+            for tms in layer.tilematrixsets:
+                if tms in self.tilematrixsets:
+                    summary.tilematrixsets[tms] = self.tilematrixsets[tms]
+        return summary
+
+
+def readCapabilitiesSummary(source):
+    """Read a CapabilitiesSummary incrementally from a file-like object.
+
+    Layer and TileMatrixSet elements are cleared as soon as their summary
+    has been extracted, so the document is never held in memory as a whole.
+    """
+    summary = CapabilitiesSummary()
+    root = None
+    contents = None
+    depth = 0
+    for event, elem in etree.iterparse(source, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if root is None:
+                root = elem
+                summary.updateSequence = elem.attrib.get("updateSequence")
+            elif depth == 2 and elem.tag == _CONTENTS_TAG:
+                contents = elem
+            continue
+
+        depth -= 1
+        if elem is root and elem.tag == _OWS_NS + "ExceptionReport":
+            exception = elem.find(_OWS_NS + "Exception")
+            code = None
+            if exception is not None:
+                code = exception.attrib.get("exceptionCode")
+            raise ServiceException(
+                "WMTS exception: %s" % code, etree.tostring(elem), code
+            )
+        if depth != 2 or contents is None:
+            continue
+
+        if elem.tag == _LAYER_TAG:
+            layer = LayerSummary(elem)
+            if layer.id:
+                summary.contents[layer.id] = layer
+        elif elem.tag == _TILE_MATRIX_SET_TAG:
+            tms = TileMatrixSetSummary(elem)
+            if tms.identifier:
+                summary.tilematrixsets[tms.identifier] = tms
+        else:
+            continue
+
+        elem.clear()
+        contents.remove(elem)
+
+    return summary
+
+
+class _TeeReader:
+    """File-like wrapper that copies everything that is read into a file"""
+
+    def __init__(self, source, target=None):
+        self.source = source
+        self.target = target
+
+    def read(self, size=-1):
+        data = self.source.read(size)
+        if self.target is not None:
+            self.target.write(data)
+        return data
+
+
+class CapabilitiesCache:
+    """Cache for WMTS capabilities documents.
+
+    Each document is downloaded and summarized once per capabilities URL
+    (see readCapabilitiesSummary). The summary is kept in a memory LRU and
+    shared between all items that use the service, which select the layers
+    they need from it. The raw documents are persisted on disk together
+    with their HTTP validators and updateSequence, so that they are reused
+    in later sessions and a stale document can be revalidated without
+    downloading it again.
+    """
+
+    def __init__(self, directory=None, maxsize=16, ttl=3600, timeout=30):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timeout = timeout
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self._urlLocks = {}
+
+    @staticmethod
+    def normalizeUrl(url):
+        """Normalize a capabilities URL into a cache key"""
+        pieces = urlparse(url.strip())
+        args = parse_qs(pieces.query, keep_blank_values=True)
+        args = [
+            (key, value)
+            for key, value in sorted(args.items())
+            if key.lower() not in ("service", "version", "request")
+        ]
+        query = urlencode(args, doseq=True)
+        return urlunparse(
+            (
+                pieces.scheme.lower(),
+                pieces.netloc.lower(),
+                pieces.path,
+                pieces.params,
+                query,
+                "",
+            )
+        )
+
+    def _getUrlLock(self, key):
+        with self._lock:
+            return self._urlLocks.setdefault(key, threading.Lock())
+
+    def _getPaths(self, key):
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return (
+            os.path.join(self.directory, f"{name}.xml"),
+            os.path.join(self.directory, f"{name}.json"),
+        )
+
+    def _isFresh(self, meta):
+        return time.time() - meta.get("fetched", 0) < self.ttl
+
+    def _remember(self, key, summary, meta):
+        with self._lock:
+            self._documents[key] = (summary, meta)
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.maxsize:
+                self._documents.popitem(last=False)
+
+    def _lookup(self, key):
+        with self._lock:
+            cached = self._documents.get(key)
+            if cached:
+                self._documents.move_to_end(key)
+        return cached or (None, None)
+
+    def _writeMeta(self, key, meta):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        _, metaPath = self._getPaths(key)
+        with open(f"{metaPath}.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{metaPath}.tmp", metaPath)
+
+    @staticmethod
+    def _getConditionalArgs(meta):
+        headers = {}
+        vendor_kwargs = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+            if meta.get("updateSequence"):
+                vendor_kwargs["updateSequence"] = meta["updateSequence"]
+        return headers, vendor_kwargs
+
+    @staticmethod
+    def _createMeta(key, response, updateSequence):
+        return {
+            "url": key,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "updateSequence": updateSequence,
+            "fetched": time.time(),
+        }
+
+    def getSummary(self, url, layers=None):
+        """Returns a CapabilitiesSummary for the given capabilities URL.
+
+        If layers are given, the summary only has these layers and their
+        tile matrix sets. The document is fetched once for all layers.
+        """
+        key = self.normalizeUrl(url)
+        with self._getUrlLock(key):
+            summary, meta = self._lookup(key)
+            if summary is None:
+                summary, meta = self._readDisk(key)
+            if summary is None or not self._isFresh(meta):
+                summary, meta = self._revalidate(key, summary, meta)
+            self._remember(key, summary, meta)
+        return summary.select(layers)
+
+    def _readDisk(self, key):
+        if not self.directory:
+            return None, None
+        xmlPath, metaPath = self._getPaths(key)
+        try:
+            with open(metaPath, "r") as f:
+                meta = json.load(f)
+            with open(xmlPath, "rb") as f:
+                return readCapabilitiesSummary(f), meta
+        except (OSError, ValueError, etree.XMLSyntaxError):
+            return None, None
+
+    def _revalidate(self, key, summary, meta):
+        """Downloads the document unless the cached one is still valid"""
+        if summary is None:
+            meta = None  # there's nothing to revalidate
+        headers, vendor_kwargs = self._getConditionalArgs(meta)
+        reader = WMTSCapabilitiesReader(url=key)
+        try:
+            result = self._download(reader, key, headers, vendor_kwargs)
+        except (ServiceException, requests.HTTPError) as e:
+            if getattr(e, "code", None) == "CurrentUpdateSequence" and meta:
+                result = None
+            elif vendor_kwargs and self._isClientError(e):
+                # server doesn't support updateSequence, ask again without
+                result = self._download(reader, key, headers)
+            else:
+                raise
+
+        if result is None:
+            # not modified
+            meta["fetched"] = time.time()
+            self._writeMeta(key, meta)
+            return summary, meta
+        return result
+
+    def _download(self, reader, key, headers, vendor_kwargs=None):
+        """Summarizes the document while it is downloaded and writes it to
+        the disk cache at the same time. Returns None if the document has
+        not been modified."""
+        response = self._fetch(
+            reader, key, headers, vendor_kwargs, stream=True
+        )
+        with response:
+            if response.status_code == 304:
+                return None
+            if 400 <= response.status_code < 500:
+                # exception reports may come with an error status
+                self._raiseExceptionReport(response.content)
+            response.raise_for_status()
+            response.raw.decode_content = True
+
+            if not self.directory:
+                summary = readCapabilitiesSummary(response.raw)
+                meta = self._createMeta(key, response, summary.updateSequence)
+                return summary, meta
+
+            os.makedirs(self.directory, exist_ok=True)
+            xmlPath, _ = self._getPaths(key)
+            tmpPath = f"{xmlPath}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmpPath, "wb") as f:
+                    source = _TeeReader(response.raw, f)
+                    summary = readCapabilitiesSummary(source)
+                    # keep anything the parser didn't need to read
+                    while source.read(1024 * 1024):
+                        pass
+                meta = self._createMeta(key, response, summary.updateSequence)
+                os.replace(tmpPath, xmlPath)
+                self._writeMeta(key, meta)
+            finally:
+                if os.path.exists(tmpPath):
+                    os.remove(tmpPath)
+            return summary, meta
+
+    def _fetch(self, reader, key, headers, vendor_kwargs=None, stream=False):
+        url = reader.capabilities_url(key, vendor_kwargs)
+        return getSession(url).get(
+            url, headers=headers, timeout=self.timeout, stream=stream
+        )
+
+    @staticmethod
+    def _isClientError(e):
+        """Whether the request was rejected, e.g. for an unknown parameter"""
+        if isinstance(e, ServiceException):
+            return True
+        return e.response is not None and 400 <= e.response.status_code < 500
+
+    @staticmethod
+    def _raiseExceptionReport(content):
+        """Raises a ServiceException if the content is an OWS exception
+        report"""
+        if b"ExceptionReport" not in content[:1024]:
+            return
+        try:
+            readCapabilitiesSummary(io.BytesIO(content))
+        except etree.XMLSyntaxError:
+            pass
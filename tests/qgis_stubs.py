@@ -0,0 +1,104 @@
+"""Minimal stand-ins for the qgis modules, so that the plugin modules can be
+imported and tested without QGIS"""
+
+import sys
+import types
+
+MODULES = [
+    "qgis",
+    "qgis.core",
+    "qgis.gui",
+    "qgis.utils",
+    "qgis.PyQt",
+    "qgis.PyQt.QtCore",
+    "qgis.PyQt.QtGui",
+    "qgis.PyQt.QtWidgets",
+    "qgis.PyQt.QtNetwork",
+    "qgis.PyQt.uic",
+]
+
+
+class StubType(type):
+    """Any attribute of a stub class is another stub class, e.g. enums like
+    QgsTask.Flag.CanCancel"""
+
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        stub = StubType(name, (Stub,), {})
+        setattr(cls, name, stub)
+        return stub
+
+    def __or__(cls, other):
+        return cls
+
+    __ror__ = __or__
+
+
+class Stub(metaclass=StubType):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Stub()
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __getitem__(self, key):
+        return Stub()
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+
+class StubModule(types.ModuleType):
+    def __init__(self, name):
+        super().__init__(name)
+        self.__path__ = []
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        stub = StubType(name, (Stub,), {})
+        setattr(self, name, stub)
+        return stub
+
+
+class Settings:
+    """In-memory QgsSettings/QSettings, as in a new QGIS profile"""
+
+    values = {"locale/userLocale": "en_US"}
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def value(self, key, defaultValue=None, type=None):
+        value = self.values.get(key, defaultValue)
+        if type is not None and value is not None:
+            value = type(value)
+        return value
+
+    def setValue(self, key, value):
+        self.values[key] = value
+
+    def remove(self, key):
+        self.values.pop(key, None)
+
+
+def install():
+    for name in MODULES:
+        if name not in sys.modules:
+            sys.modules[name] = StubModule(name)
+    for name in MODULES:
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, sys.modules[name])
+    sys.modules["qgis.core"].QgsSettings = Settings
+    sys.modules["qgis.core"].Qgis.versionInt = staticmethod(lambda: 34000)
+    sys.modules["qgis.PyQt.QtCore"].QSettings = Settings
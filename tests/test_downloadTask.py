@@ -0,0 +1,74 @@
+import threading
+from types import SimpleNamespace
+
+from openeo_plugin.gui.browser.OpenEOStacAssetItem import OpenEOStacAssetItem
+from openeo_plugin.utils.downloadTask import DownloadJobAssetsTask
+
+
+class JobItem:
+    def __init__(self, assetItems):
+        self.assetItems = assetItems
+
+    def populateAssetItems(self):
+        pass
+
+
+def createAssetItem(key, href, barrier):
+    parent = SimpleNamespace(
+        plugin=SimpleNamespace(PLUGIN_ENTRY_NAME="openeo")
+    )
+    asset = {"href": href, "file:size": len(href)}
+    item = OpenEOStacAssetItem(asset, key, parent)
+
+    def downloadToFile(href, path, onProgress=None, isCanceled=None):
+        # both downloads have chosen their names before any file exists
+        barrier.wait(timeout=5)
+        path.write_text(href)
+        return {"size": len(href)}
+
+    item.downloadToFile = downloadToFile
+    return item
+
+
+HREFS = [
+    "https://example.com/a/result.tif",
+    "https://example.com/b/result.tif",
+]
+
+
+def createAssetItems():
+    barrier = threading.Barrier(2)
+    return [
+        createAssetItem(f"asset{i}", href, barrier)
+        for i, href in enumerate(HREFS)
+    ]
+
+
+def runTask(assets, dir, **kwargs):
+    task = DownloadJobAssetsTask(
+        "test", JobItem(assets), dir, concurrency=2, **kwargs
+    )
+    task.isCanceled = lambda: False
+    assert task.run()
+    assert task.errors == 0
+    return task
+
+
+def test_assets_with_the_same_name_are_saved_separately(tmp_path):
+    runTask(createAssetItems(), tmp_path)
+
+    files = sorted(tmp_path.iterdir())
+    assert [f.name for f in files] == ["result.tif", "result_(2).tif"]
+    assert sorted(f.read_text() for f in files) == HREFS
+
+
+def test_assets_with_the_same_name_are_synced_separately(tmp_path):
+    runTask(createAssetItems(), tmp_path, sync=True)
+
+    files = sorted(f for f in tmp_path.iterdir() if f.suffix == ".tif")
+    assert [f.name for f in files] == ["result.tif", "result_(2).tif"]
+    assert [f.read_text() for f in files] == HREFS
+
+    # each asset is synced to the same file again, so nothing is downloaded
+    task = runTask(createAssetItems(), tmp_path, sync=True)
+    assert task.skipped == 2
@@ -0,0 +1,50 @@
+from openeo_plugin.utils.mosaic import RasterSignature, groupRasters
+
+
+def signature(extent, pixelSize=(10, -10)):
+    sig = RasterSignature.__new__(RasterSignature)
+    sig.dataTypes = (6,)
+    sig.descriptions = ("B04",)
+    sig.nodata = (None,)
+    sig.crs = "EPSG:32632"
+    sig.pixelSize = pixelSize
+    sig.extent = extent
+    return sig
+
+
+def test_adjacent_tiles_are_grouped():
+    rasters = [
+        ("2024-01-01", "a.tif", signature((0, 0, 100, 100))),
+        ("2024-01-01", "b.tif", signature((100, 0, 200, 100))),
+        ("2024-01-02", "c.tif", signature((0, 0, 100, 100))),
+    ]
+    groups = groupRasters(rasters)
+    assert [(time, paths) for time, _, paths in groups] == [
+        ("2024-01-01", ["a.tif", "b.tif"]),
+        ("2024-01-02", ["c.tif"]),
+    ]
+
+
+def test_overlapping_tiles_are_not_grouped():
+    rasters = [
+        ("2024-01-01", "a.tif", signature((0, 0, 100, 100))),
+        ("2024-01-01", "b.tif", signature((50, 0, 150, 100))),
+    ]
+    assert groupRasters(rasters) == []
+
+
+def test_unknown_time_step_is_not_grouped():
+    rasters = [
+        (None, "a.tif", signature((0, 0, 100, 100))),
+        (None, "b.tif", signature((100, 0, 200, 100))),
+    ]
+    assert groupRasters(rasters) == []
+
+
+def test_different_resolutions_are_not_grouped():
+    rasters = [
+        ("2024-01-01", "a.tif", signature((0, 0, 100, 100))),
+        ("2024-01-01", "b.tif", signature((100, 0, 200, 100), (20, -20))),
+    ]
+    groups = groupRasters(rasters)
+    assert [paths for _, _, paths in groups] == [["a.tif"], ["b.tif"]]
@@ -0,0 +1,86 @@
+import sys
+import types
+
+import pytest
+
+from openeo_plugin.utils import remoteAccess
+
+URL = "/vsicurl/https://example.com/results/result.tif"
+PREFIX = "/vsicurl/https://example.com/"
+
+
+class FakeGdal(types.ModuleType):
+    def __init__(self):
+        super().__init__("osgeo.gdal")
+        self.config = {}
+        self.pathOptions = {}
+        self.failOn = None
+
+    def GetConfigOption(self, key):
+        return self.config.get(key)
+
+    def SetConfigOption(self, key, value):
+        if value is None:
+            self.config.pop(key, None)
+        else:
+            self.config[key] = value
+
+    def SetPathSpecificOption(self, prefix, key, value):
+        if key == self.failOn:
+            raise RuntimeError(key)
+        self.pathOptions.setdefault(prefix, {})[key] = value
+
+    def ClearPathSpecificOptions(self, prefix):
+        self.pathOptions.pop(prefix, None)
+
+
+@pytest.fixture
+def gdal(monkeypatch):
+    gdal = FakeGdal()
+    osgeo = types.ModuleType("osgeo")
+    osgeo.gdal = gdal
+    monkeypatch.setitem(sys.modules, "osgeo", osgeo)
+    monkeypatch.setitem(sys.modules, "osgeo.gdal", gdal)
+    monkeypatch.setattr(remoteAccess, "isRemoteAccessEnabled", lambda: True)
+    monkeypatch.setattr(
+        remoteAccess,
+        "getRemoteAccessOptions",
+        lambda: dict(
+            remoteAccess.DEFAULT_REMOTE_OPTIONS,
+            **remoteAccess.DEFAULT_GLOBAL_OPTIONS,
+        ),
+    )
+    yield gdal
+    remoteAccess.resetRemoteAccessOptions()
+
+
+def test_reset_restores_global_options(gdal):
+    gdal.config["VSI_CACHE_SIZE"] = "1000"  # configured by the user
+
+    remoteAccess.applyRemoteAccessOptions(URL)
+    assert PREFIX in gdal.pathOptions
+    assert "CPL_VSIL_CURL_CACHE_SIZE" in gdal.config
+
+    remoteAccess.resetRemoteAccessOptions()
+    assert gdal.pathOptions == {}
+    assert gdal.config == {"VSI_CACHE_SIZE": "1000"}
+
+
+class Logging:
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, message, error=None):
+        self.warnings.append((message, error))
+
+
+def test_prefix_is_applied_again_after_a_failure(gdal):
+    gdal.failOn = "GDAL_HTTP_MULTIPLEX"
+    logging = Logging()
+    assert remoteAccess.applyRemoteAccessOptions(URL, logging) == URL
+    assert PREFIX not in gdal.pathOptions
+    assert len(logging.warnings) == 1
+
+    gdal.failOn = None
+    remoteAccess.applyRemoteAccessOptions(URL)
+    assert gdal.pathOptions[PREFIX]["GDAL_HTTP_MULTIPLEX"] == "YES"
@@ -0,0 +1,181 @@
+"""Counts the HTTP requests and bytes that GDAL needs to open a job result
+COG through /vsicurl/ and render an overview of it, with and without the
+remote access profile. Run with `pytest -s` to see the report. Skipped if
+GDAL isn't available."""
+
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from openeo_plugin.utils import remoteAccess
+
+gdal = pytest.importorskip("osgeo.gdal")
+
+SIZE = 4096
+BLOCK_SIZE = 512
+# the size the overview is rendered at, like a layer in a map canvas
+RENDER_SIZE = 512
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves the COG with single and multiple byte ranges, other paths
+    (directory listings, sidecar files) are not found"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.handle_request(head=True)
+
+    def do_GET(self):
+        self.handle_request(head=False)
+
+    def handle_request(self, head):
+        data = self.server.files.get(self.path.split("?", 1)[0])
+        with self.server.lock:
+            self.server.requests += 1
+        if data is None:
+            self.send(404, b"", {})
+            return
+
+        ranges = []
+        header = self.headers.get("Range")
+        if header:
+            for start, end in re.findall(r"(\d+)-(\d*)", header):
+                end = int(end) if end else len(data) - 1
+                ranges.append((int(start), min(end, len(data) - 1)))
+
+        if not ranges:
+            self.send(200, data, {}, head)
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            contentRange = f"bytes {start}-{end}/{len(data)}"
+            self.send(
+                206,
+                data[start : end + 1],
+                {"Content-Range": contentRange},
+                head,
+            )
+        else:
+            boundary = "benchmark-boundary"
+            body = b""
+            for start, end in ranges:
+                body += (
+                    f"--{boundary}\r\n"
+                    "Content-Type: application/octet-stream\r\n"
+                    f"Content-Range: bytes {start}-{end}/{len(data)}\r\n\r\n"
+                ).encode()
+                body += data[start : end + 1] + b"\r\n"
+            body += f"--{boundary}--\r\n".encode()
+            contentType = f"multipart/byteranges; boundary={boundary}"
+            self.send(206, body, {"Content-Type": contentType}, head)
+
+    def send(self, status, body, headers, head=False):
+        self.send_response(status)
+        headers.setdefault("Content-Type", "image/tiff")
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+            with self.server.lock:
+                self.server.bytes += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def createCog(path):
+    mem = gdal.GetDriverByName("MEM").Create(
+        "", SIZE, SIZE, 1, gdal.GDT_UInt16
+    )
+    mem.SetGeoTransform([500000, 10, 0, 5000000, 0, -10])
+    band = mem.GetRasterBand(1)
+    row = bytes(range(256)) * (SIZE * 2 // 256)
+    for y in range(0, SIZE, BLOCK_SIZE):
+        band.WriteRaster(0, y, SIZE, BLOCK_SIZE, row * BLOCK_SIZE)
+    gdal.Translate(
+        str(path),
+        mem,
+        format="COG",
+        creationOptions=[
+            f"BLOCKSIZE={BLOCK_SIZE}",
+            "COMPRESS=DEFLATE",
+            "OVERVIEWS=AUTO",
+        ],
+    )
+    return path.read_bytes()
+
+
+def serve(cog):
+    """Starts a server for the COG, each server is a separate host for the
+    path specific options"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    server.files = {"/results/openEO_2024-01-01Z.tif": cog}
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.bytes = 0
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True
+    )
+    thread.start()
+    return server
+
+
+def openAndRender(server):
+    url = (
+        f"/vsicurl/http://127.0.0.1:{server.server_port}"
+        "/results/openEO_2024-01-01Z.tif"
+    )
+    remoteAccess.applyRemoteAccessOptions(url)
+    ds = gdal.Open(url)
+    assert ds is not None
+    data = ds.GetRasterBand(1).ReadRaster(
+        buf_xsize=RENDER_SIZE, buf_ysize=RENDER_SIZE
+    )
+    assert data
+    ds = None
+    return server.requests, server.bytes
+
+
+@pytest.fixture
+def profile(monkeypatch):
+    enabled = {"value": False}
+    monkeypatch.setattr(
+        remoteAccess, "isRemoteAccessEnabled", lambda: enabled["value"]
+    )
+    monkeypatch.setattr(
+        remoteAccess,
+        "getRemoteAccessOptions",
+        lambda: dict(
+            remoteAccess.DEFAULT_REMOTE_OPTIONS,
+            **remoteAccess.DEFAULT_GLOBAL_OPTIONS,
+        ),
+    )
+    yield enabled
+    remoteAccess.resetRemoteAccessOptions()
+
+
+def test_remote_access_profile_benchmark(tmp_path, profile):
+    cog = createCog(tmp_path / "cog.tif")
+    servers = [serve(cog), serve(cog)]
+    try:
+        gdal.VSICurlClearCache()
+        requestsBefore, bytesBefore = openAndRender(servers[0])
+        profile["value"] = True
+        requestsAfter, bytesAfter = openAndRender(servers[1])
+    finally:
+        gdal.VSICurlClearCache()
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    print(
+        f"\nOpen and render a {SIZE}x{SIZE} COG ({len(cog)} bytes):"
+        f"\n  without profile: {requestsBefore} requests, {bytesBefore} bytes"
+        f"\n  with profile:    {requestsAfter} requests, {bytesAfter} bytes"
+    )
+    assert requestsAfter <= requestsBefore
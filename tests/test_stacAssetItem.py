@@ -0,0 +1,87 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from openeo_plugin.gui.browser.OpenEOStacAssetItem import OpenEOStacAssetItem
+
+CONTENT = bytes(range(256)) * 64
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        offset = 0
+        if self.headers.get("Range"):
+            offset = int(self.headers["Range"][len("bytes=") : -1])
+        body = CONTENT[offset:]
+        self.send_response(206 if offset else 200)
+        if offset:
+            self.send_header(
+                "Content-Range",
+                f"bytes {offset}-{len(CONTENT) - 1}/{len(CONTENT)}",
+            )
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    server.requests = []
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def download(server, tmp_path, partHref, validator):
+    """Downloads the asset with a leftover ".part" file of 100 bytes that
+    was downloaded from partHref, or from the asset itself if it's None"""
+    href = f"http://127.0.0.1:{server.server_port}/job/result.tif"
+    parent = SimpleNamespace(
+        plugin=SimpleNamespace(PLUGIN_ENTRY_NAME="openeo")
+    )
+    item = OpenEOStacAssetItem({"href": href}, "result", parent)
+
+    path = tmp_path / "result.tif"
+    part = tmp_path / "result.tif.part"
+    # the part of another asset has other bytes
+    part.write_bytes(CONTENT[:100] if partHref is None else b"x" * 100)
+    info = {"href": partHref or href, "etag": validator, "size": None}
+    (tmp_path / "result.tif.part.json").write_text(json.dumps(info))
+
+    item.downloadToFile(href, path)
+    return path.read_bytes(), server.requests[-1]
+
+
+def test_part_of_the_same_asset_is_resumed(server, tmp_path):
+    content, request = download(server, tmp_path, None, ETAG)
+    assert content == CONTENT
+    assert request["Range"] == "bytes=100-"
+    assert request["If-Range"] == ETAG
+
+
+def test_part_of_another_asset_is_discarded(server, tmp_path):
+    content, request = download(
+        server, tmp_path, "https://example.com/other/result.tif", ETAG
+    )
+    assert content == CONTENT
+    assert "Range" not in request
+
+
+def test_part_without_validator_is_discarded(server, tmp_path):
+    content, request = download(server, tmp_path, None, None)
+    assert content == CONTENT
+    assert "Range" not in request
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+TESTS_DIR = os.path.dirname(__file__)
+ROOT_DIR = os.path.dirname(TESTS_DIR)
+
+# run in a new interpreter, as other tests import these modules
+SCRIPT = """
+import json
+import sys
+import time
+
+import qgis_stubs
+
+qgis_stubs.install()
+start = time.perf_counter()
+import openeo_plugin
+
+imported = time.perf_counter()
+openeo_plugin.classFactory(qgis_stubs.Stub())
+initialized = time.perf_counter()
+
+print(json.dumps({{
+    "import": imported - start,
+    "classFactory": initialized - imported,
+    "budget": openeo_plugin.STARTUP_BUDGET,
+    "modules": sorted(m for m in {modules!r} if m in sys.modules),
+}}))
+"""
+
+
+def measureStartup(modules):
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(modules=modules)],
+        cwd=ROOT_DIR,
+        env=dict(
+            os.environ, PYTHONPATH=os.pathsep.join([TESTS_DIR, ROOT_DIR])
+        ),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_startup_time():
+    """Reports the time for importing the plugin and calling classFactory,
+    without the time QGIS itself takes to import"""
+    startup = measureStartup(["openeo", "owslib", "requests", "dateutil"])
+    total = startup["import"] + startup["classFactory"]
+    print(
+        f"\nStartup: import {startup['import'] * 1000:.0f} ms, "
+        f"classFactory {startup['classFactory'] * 1000:.0f} ms, "
+        f"total {total * 1000:.0f} ms "
+        f"(budget {startup['budget'] * 1000:.0f} ms)"
+    )
+
+    assert startup["modules"] == []
+    assert total <= startup["budget"]
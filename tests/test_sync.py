@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+from openeo_plugin.gui.browser.OpenEOStacAssetItem import OpenEOStacAssetItem
+from openeo_plugin.utils.syncManifest import SyncManifest
+
+HREF = "https://example.com/results/result.tif"
+CONTENT = b"x" * 100
+
+
+def createAssetItem(head):
+    parent = SimpleNamespace(
+        plugin=SimpleNamespace(PLUGIN_ENTRY_NAME="openeo")
+    )
+    item = OpenEOStacAssetItem({"href": HREF}, "result", parent)
+    item.downloads = 0
+
+    def downloadToFile(href, path, onProgress=None, isCanceled=None):
+        item.downloads += 1
+        path.write_bytes(CONTENT)
+        return {"etag": None, "last_modified": None, "size": len(CONTENT)}
+
+    item.downloadToFile = downloadToFile
+    item.headAsset = lambda href: dict(head)
+    return item
+
+
+def optimize(path, manifest):
+    """Changes the local file like optimizeRaster and updates the manifest
+    like DownloadJobAssetsTask.optimizeAsset"""
+    path.write_bytes(b"y" * 60)
+    manifest.set(path, manifest.get(path))
+
+
+def test_optimized_file_is_not_downloaded_again(tmp_path):
+    head = {"etag": None, "last_modified": None, "size": len(CONTENT)}
+    item = createAssetItem(head)
+    manifest = SyncManifest(tmp_path)
+
+    path, downloaded = item.syncAsset(tmp_path, manifest)
+    assert downloaded
+    optimize(path, manifest)
+
+    path, downloaded = item.syncAsset(tmp_path, manifest)
+    assert not downloaded
+    assert item.downloads == 1
+    assert manifest.get(path)["size"] == len(CONTENT)
+    assert manifest.get(path)["local_size"] == 60
+
+
+def test_changed_remote_size_is_downloaded_again(tmp_path):
+    head = {"etag": None, "last_modified": None, "size": len(CONTENT)}
+    item = createAssetItem(head)
+    manifest = SyncManifest(tmp_path)
+
+    item.syncAsset(tmp_path, manifest)
+    item.headAsset = lambda href: dict(head, size=len(CONTENT) + 1)
+
+    _, downloaded = item.syncAsset(tmp_path, manifest)
+    assert downloaded
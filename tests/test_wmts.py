@@ -0,0 +1,158 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from openeo_plugin.utils.wmts import CapabilitiesCache, CapabilitiesSummary
+
+CAPABILITIES = b"""<?xml version="1.0"?>
+<Capabilities xmlns="http://www.opengis.net/wmts/1.0"
+    xmlns:ows="http://www.opengis.net/ows/1.1" version="1.0.0"
+    updateSequence="6">
+  <Contents>
+    <Layer>
+      <ows:Identifier>ndvi</ows:Identifier>
+      <TileMatrixSetLink><TileMatrixSet>grid</TileMatrixSet></TileMatrixSetLink>
+    </Layer>
+    <Layer>
+      <ows:Identifier>rgb</ows:Identifier>
+      <TileMatrixSetLink><TileMatrixSet>wgs84</TileMatrixSet></TileMatrixSetLink>
+    </Layer>
+    <TileMatrixSet>
+      <ows:Identifier>grid</ows:Identifier>
+      <ows:SupportedCRS>EPSG:3857</ows:SupportedCRS>
+    </TileMatrixSet>
+    <TileMatrixSet>
+      <ows:Identifier>wgs84</ows:Identifier>
+      <ows:SupportedCRS>EPSG:4326</ows:SupportedCRS>
+    </TileMatrixSet>
+  </Contents>
+</Capabilities>
+"""
+
+
+def exceptionReport(code):
+    return (
+        b'<?xml version="1.0"?>'
+        b'<ows:ExceptionReport xmlns:ows="http://www.opengis.net/ows/1.1">'
+        b'<ows:Exception exceptionCode="' + code.encode() + b'"/>'
+        b"</ows:ExceptionReport>"
+    )
+
+
+class Server(HTTPServer):
+    # response to requests with updateSequence: (status, body)
+    updateSequenceResponse = (400, b"Bad Request")
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.queries = []
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.server.queries.append(query)
+        if "updateSequence" in query:
+            status, body = self.server.updateSequenceResponse
+        else:
+            status, body = 200, CAPABILITIES
+        self.send_response(status)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = Server()
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def getUrl(server):
+    return f"http://127.0.0.1:{server.server_port}/wmts"
+
+
+def getStaleSummary(server, cache):
+    """Returns the summary for a cached document with updateSequence 5 that
+    needs to be revalidated"""
+    url = getUrl(server)
+    meta = {"fetched": 0, "updateSequence": "5"}
+    cached = CapabilitiesSummary()
+    cache._remember(cache.normalizeUrl(url), cached, meta)
+    return cache.getSummary(url), cached
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        (400, b"Bad Request"),
+        (400, exceptionReport("InvalidParameterValue")),
+        (200, exceptionReport("InvalidParameterValue")),
+    ],
+)
+def test_retry_without_update_sequence(server, response):
+    server.updateSequenceResponse = response
+    summary, _ = getStaleSummary(server, CapabilitiesCache())
+
+    assert ["updateSequence" in query for query in server.queries] == [
+        True,
+        False,
+    ]
+    assert list(summary.contents) == ["ndvi", "rgb"]
+    assert summary.updateSequence == "6"
+
+
+@pytest.mark.parametrize("status", [200, 400])
+def test_current_update_sequence(server, status):
+    server.updateSequenceResponse = (
+        status,
+        exceptionReport("CurrentUpdateSequence"),
+    )
+    summary, cached = getStaleSummary(server, CapabilitiesCache())
+
+    assert len(server.queries) == 1
+    assert summary is cached
+
+
+def test_server_errors_are_not_retried(server):
+    server.updateSequenceResponse = (501, b"Not Implemented")
+
+    with pytest.raises(requests.HTTPError):
+        getStaleSummary(server, CapabilitiesCache())
+    assert len(server.queries) == 1
+
+
+def test_layers_share_one_download(server, tmp_path):
+    cache = CapabilitiesCache(str(tmp_path))
+    ndvi = cache.getSummary(getUrl(server), ["ndvi"])
+    rgb = cache.getSummary(getUrl(server), ["rgb"])
+
+    assert len(server.queries) == 1
+    assert list(ndvi.contents) == ["ndvi"]
+    assert list(ndvi.tilematrixsets) == ["grid"]
+    assert list(rgb.contents) == ["rgb"]
+    assert rgb.tilematrixsets["wgs84"].crs == "EPSG:4326"
+
+
+def test_document_is_reused_across_sessions(server, tmp_path):
+    CapabilitiesCache(str(tmp_path)).getSummary(getUrl(server), ["ndvi"])
+    # a new session reads the complete document from the disk cache
+    summary = CapabilitiesCache(str(tmp_path)).getSummary(
+        getUrl(server), ["rgb"]
+    )
+
+    assert len(server.queries) == 1
+    assert list(summary.contents) == ["rgb"]